@@ -0,0 +1,114 @@
+import time
+from collections import OrderedDict
+
+# Why a command was turned away, see AdmissionControl.last_rejection
+USER_BUSY = 'user'
+CHANNEL_BUSY = 'channel'
+
+
+class Ticket:
+    """
+    An admitted command, holds its user and channel in-flight slots until released
+    """
+
+    def __init__(self, control, user_id, channel_id):
+        self.control = control
+        self.user_id = user_id
+        self.channel_id = channel_id
+
+    def release(self):
+        self.control._release(self.user_id, self.channel_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionControl:
+    """
+    Admission control in front of the command handlers.
+    Each user gets a small token bucket as a cooldown, users and channels have
+    a cap on commands in flight, and the same command repeated by a user in a
+    channel within the dedup window is dropped. Rejections happen before any network I/O.
+    Params
+        - user_rate -> commands a user regains per second
+        - user_burst -> commands a user may fire back to back
+        - max_user_inflight -> commands in flight per user
+        - max_channel_inflight -> commands in flight per channel
+        - dedup_window -> seconds a user's identical command in a channel is dropped for
+        - max_tracked -> users and recent commands remembered before the oldest are forgotten
+    """
+
+    def __init__(self, user_rate=0.5, user_burst=3, max_user_inflight=2, max_channel_inflight=4,
+                 dedup_window=3, max_tracked=100_000):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_user_inflight = max_user_inflight
+        self.max_channel_inflight = max_channel_inflight
+        self.dedup_window = dedup_window
+        self.max_tracked = max_tracked
+        self.rejected = 0
+        self.last_rejection = None
+        self._buckets = OrderedDict()
+        self._recent = OrderedDict()
+        self._user_inflight = {}
+        self._channel_inflight = {}
+
+    def admit(self, user_id, channel_id, command):
+        """
+        Try to admit a command
+        Params
+            - command -> the normalized command text, used for de-duplication
+        Returns
+            - Ticket to release when the command finishes, or None if it was rejected,
+              last_rejection then tells whether the user or their channel was too busy
+        """
+        now = time.monotonic()
+        if self._channel_inflight.get(channel_id, 0) >= self.max_channel_inflight:
+            self.last_rejection = CHANNEL_BUSY
+        elif (self._user_inflight.get(user_id, 0) >= self.max_user_inflight
+                or self._is_duplicate(user_id, channel_id, command, now)
+                or not self._take(user_id, now)):
+            self.last_rejection = USER_BUSY
+        else:
+            self.last_rejection = None
+        if self.last_rejection is not None:
+            self.rejected += 1
+            return None
+        self._user_inflight[user_id] = self._user_inflight.get(user_id, 0) + 1
+        self._channel_inflight[channel_id] = self._channel_inflight.get(channel_id, 0) + 1
+        return Ticket(self, user_id, channel_id)
+
+    def _is_duplicate(self, user_id, channel_id, command, now):
+        key = (user_id, channel_id, command)
+        seen = self._recent.get(key)
+        if seen is not None and now - seen < self.dedup_window:
+            return True
+        self._recent[key] = now
+        self._recent.move_to_end(key)
+        # Entries are in insertion order, so expired ones sit at the front
+        while self._recent and (len(self._recent) > self.max_tracked
+                                or now - next(iter(self._recent.values())) >= self.dedup_window):
+            self._recent.popitem(last=False)
+        return False
+
+    def _take(self, user_id, now):
+        tokens, updated = self._buckets.pop(user_id, (self.user_burst, now))
+        tokens = min(self.user_burst, tokens + (now - updated) * self.user_rate)
+        admitted = tokens >= 1
+        if admitted:
+            tokens -= 1
+        self._buckets[user_id] = (tokens, now)
+        if len(self._buckets) > self.max_tracked:
+            self._buckets.popitem(last=False)
+        return admitted
+
+    def _release(self, user_id, channel_id):
+        for counts, key in ((self._user_inflight, user_id), (self._channel_inflight, channel_id)):
+            remaining = counts[key] - 1
+            if remaining:
+                counts[key] = remaining
+            else:
+                del counts[key]
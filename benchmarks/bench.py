@@ -0,0 +1,152 @@
+"""
+Load test the bot offline: a fake TMDB serves fixtures, synthetic messages are
+driven through on_message, and latency, throughput and TMDB calls per command
+are reported. Exits non-zero when a --max-* threshold is exceeded, for CI.
+
+    python benchmarks/bench.py --messages 5000 --concurrency 100 --warm
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_discord import message_source
+from fake_tmdb import FakeTMDB
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(args):
+    server = FakeTMDB(latency=args.latency, jitter=args.jitter, rate_limited=args.rate_limited, seed=args.seed)
+    os.environ['TMDB_BASE_URL'] = await server.start()
+    os.environ.setdefault('TMDB_API_KEY', 'benchmark')
+    os.environ['POOL_PAGES'] = str(args.pool_pages)
+    # Benchmarks never touch the on-disk stores
+    os.environ.pop('CATALOG_PATH', None)
+    os.environ.pop('HISTORY_PATH', None)
+
+    import movie_bot
+    from genre_pool import pools
+    from metrics import metrics
+    from tmdb_client import tmdb
+
+    if args.warm:
+        started = time.perf_counter()
+        await movie_bot.warm_up()
+        print(f'Warm up took {time.perf_counter() - started:.1f}s and {server.requests} TMDB calls')
+    warm_requests = server.requests
+    rejected_before = movie_bot.admission.rejected
+    overruns_before = metrics.counter_total('moviebot_command_deadline_overruns_total')
+
+    latencies = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def drive(message):
+        route = movie_bot.router.resolve(message.content)
+        command = ' '.join(route[0].path) if route else 'unknown'
+        async with semaphore:
+            start = time.perf_counter()
+            await movie_bot.on_message(message)
+            latencies.setdefault(command, []).append(time.perf_counter() - start)
+
+    messages = list(message_source(args.messages, users=args.users or args.messages,
+                                   channels=args.channels or max(1, args.messages // 2), seed=args.seed))
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(message) for message in messages))
+    elapsed = time.perf_counter() - started
+
+    # Let pool builds kicked off by cold cache misses finish before the session closes
+    await asyncio.gather(*pools._building.values(), return_exceptions=True)
+    movie_bot.scheduler.stop()
+    for task in list(movie_bot.BACKGROUND_TASKS):
+        task.cancel()
+    await tmdb.close()
+    await server.stop()
+
+    every = [latency for values in latencies.values() for latency in values]
+    calls = server.requests - warm_requests
+    report = {
+        'messages': len(messages),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(messages) / elapsed, 1),
+        'p50_ms': round(percentile(every, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(every, 0.99) * 1000, 2),
+        'tmdb_calls': calls,
+        'tmdb_calls_per_command': round(calls / len(messages), 3),
+        'tmdb_429s': server.throttled,
+        'rejected': movie_bot.admission.rejected - rejected_before,
+        'deadline_overruns': metrics.counter_total('moviebot_command_deadline_overruns_total') - overruns_before,
+        'commands': {
+            command: {
+                'count': len(values),
+                'p50_ms': round(percentile(values, 0.5) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            }
+            for command, values in sorted(latencies.items())
+        },
+    }
+    return report
+
+
+def print_report(report):
+    print(f"{report['messages']} messages in {report['seconds']}s ({report['throughput']} msg/s)")
+    print(f"Latency p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms")
+    print(f"TMDB calls: {report['tmdb_calls']} ({report['tmdb_calls_per_command']} per command), "
+          f"429s: {report['tmdb_429s']}, rejected by admission: {report['rejected']}, "
+          f"deadline overruns: {report['deadline_overruns']}")
+    for command, stats in report['commands'].items():
+        print(f"- !{command}: {stats['count']} runs, p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+
+
+def check(report, args):
+    """
+    Returns
+        - list of threshold failures
+    """
+    failures = []
+    if args.max_p99_ms is not None and report['p99_ms'] > args.max_p99_ms:
+        failures.append(f"p99 {report['p99_ms']} ms > {args.max_p99_ms} ms")
+    if args.max_calls_per_command is not None and report['tmdb_calls_per_command'] > args.max_calls_per_command:
+        failures.append(f"{report['tmdb_calls_per_command']} TMDB calls per command > {args.max_calls_per_command}")
+    if args.min_throughput is not None and report['throughput'] < args.min_throughput:
+        failures.append(f"throughput {report['throughput']} msg/s < {args.min_throughput}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the bot against a fake TMDB and synthetic messages')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100, help='messages handled at once')
+    parser.add_argument('--users', type=int, help='distinct authors (default: one per message)')
+    parser.add_argument('--channels', type=int, help='distinct channels (default: one per two messages)')
+    parser.add_argument('--latency', type=float, default=0.05, help='fake TMDB response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--rate-limited', type=float, default=0.0, help='fraction of TMDB requests answered 429')
+    parser.add_argument('--pool-pages', type=int, default=2, help='discover pages per genre pool')
+    parser.add_argument('--warm', action='store_true', help='run the bot warm up (pools, recommender) first')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--max-p99-ms', type=float)
+    parser.add_argument('--max-calls-per-command', type=float)
+    parser.add_argument('--min-throughput', type=float)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    failures = check(report, args)
+    for failure in failures:
+        print('FAIL:', failure)
+    sys.exit(1 if failures else 0)
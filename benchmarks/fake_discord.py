@@ -0,0 +1,108 @@
+import itertools
+import random
+
+MOVIE_GENRES = ('action', 'comedy', 'horror', 'drama', 'sci-fi', 'science fiction', 'romance', 'thriller',
+                'animation', 'western', 'rom com', 'documentary')
+TV_GENRES = ('comedy', 'drama', 'crime', 'kids', 'reality', 'mystery', 'sci-fi & fantasy', 'action')
+LIKE_TITLES = ('night river', 'the last star', 'ghost city', 'silent storm', 'lost empire')
+
+_ids = itertools.count(1)
+
+
+class FakeUser:
+    def __init__(self, user_id, administrator=False):
+        self.id = user_id
+        self.bot = False
+        self.guild_permissions = FakePermissions(administrator)
+
+
+class FakePermissions:
+    def __init__(self, administrator):
+        self.administrator = administrator
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+
+class FakeSentMessage:
+    def __init__(self, channel, content, kwargs):
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = content
+        self.kwargs = kwargs
+
+    async def edit(self, **kwargs):
+        self.kwargs.update(kwargs)
+        return self
+
+
+class FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeChannel:
+    """
+    Channel that records what the bot sends instead of calling Discord
+    """
+
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        return FakeSentMessage(self, content, kwargs)
+
+    def typing(self):
+        return FakeTyping()
+
+
+class FakeMessage:
+    def __init__(self, content, author, channel, guild):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+
+
+def synthetic_command(rng):
+    """
+    One random !recommend variant, with the odd typo in the genre
+    """
+    roll = rng.random()
+    if roll < 0.35:
+        return f'!recommend {typo(rng, rng.choice(MOVIE_GENRES))}'
+    if roll < 0.45:
+        return '!recommend random'
+    if roll < 0.70:
+        return f'!recommend list {typo(rng, rng.choice(MOVIE_GENRES))}'
+    if roll < 0.90:
+        return f'!recommend tv {rng.choice(TV_GENRES)}'
+    return f'!recommend like {rng.choice(LIKE_TITLES)}'
+
+
+def typo(rng, word):
+    if len(word) < 5 or rng.random() > 0.1:
+        return word
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def message_source(count, users=1000, channels=200, guilds=20, seed=0):
+    """
+    Generate synthetic command messages spread over users, channels and guilds
+    """
+    rng = random.Random(seed)
+    user_list = [FakeUser(i) for i in range(1, users + 1)]
+    channel_list = [FakeChannel(i) for i in range(1, channels + 1)]
+    guild_list = [FakeGuild(i) for i in range(1, guilds + 1)]
+    for _ in range(count):
+        channel = rng.choice(channel_list)
+        yield FakeMessage(synthetic_command(rng), rng.choice(user_list), channel, guild_list[channel.id % guilds])
@@ -0,0 +1,135 @@
+import time
+from collections import OrderedDict
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# (endpoint prefix, ttl, stale window) -- first match wins
+ENDPOINT_TTLS = [
+    ('/genre/', 3 * DAY, 4 * DAY),
+    ('/configuration', DAY, 7 * DAY),
+    ('/movie/popular', 10 * MINUTE, HOUR),
+    ('/tv/popular', 10 * MINUTE, HOUR),
+    ('/discover/', 30 * MINUTE, 6 * HOUR),
+]
+DEFAULT_TTL = (15 * MINUTE, HOUR)
+
+
+class CacheEntry:
+    __slots__ = ('data', 'size', 'fetched_at', 'expires_at', 'stale_until')
+
+    def __init__(self, data, size, fetched_at, ttl, stale):
+        self.data = data
+        self.size = size
+        self.fetched_at = fetched_at
+        self.expires_at = fetched_at + ttl
+        self.stale_until = self.expires_at + stale
+
+
+class ResponseCache:
+    """
+    LRU cache of decoded TMDB responses bounded by the size of their raw bodies.
+    Entries are fresh until their endpoint TTL runs out, and can still be served
+    while stale for an extra window so the caller can revalidate in the background.
+    Past that window they are kept, LRU permitting, as a last resort for outages.
+    Params
+        - max_bytes -> upper bound on the summed body size of all entries
+        - ttls -> list of (endpoint prefix, ttl, stale window) in seconds
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttls=ENDPOINT_TTLS):
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.size = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(path, params=None):
+        """
+        Build the cache key from the endpoint and its normalized query params.
+        The api key never takes part in the key.
+        """
+        if not params:
+            return path
+        query = '&'.join(f'{k}={params[k]}' for k in sorted(params) if k != 'api_key' and params[k] is not None)
+        return f'{path}?{query}' if query else path
+
+    def ttl_for(self, path):
+        for prefix, ttl, stale in self.ttls:
+            if path.startswith(prefix):
+                return ttl, stale
+        return DEFAULT_TTL
+
+    def lookup(self, key):
+        """
+        Look up a key
+        Returns
+            - (data, fresh) -> fresh is False when the entry is past its TTL but inside its stale window
+            - None when the key is missing or too old to serve
+        """
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is None or now > entry.stale_until:
+            # Expired entries stay until the LRU pushes them out, for lookup_expired
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if now <= entry.expires_at:
+            self.hits += 1
+            return entry.data, True
+        self.stale_hits += 1
+        return entry.data, False
+
+    def lookup_expired(self, key):
+        """
+        Look up a key ignoring its age, for answering while TMDB is unreachable
+        Returns
+            - data, or None when the key is missing
+        """
+        entry = self._entries.get(key)
+        return entry.data if entry is not None else None
+
+    def store(self, key, path, data, size, fetched_at=None):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        ttl, stale = self.ttl_for(path)
+        self._entries[key] = CacheEntry(data, size, fetched_at or time.time(), ttl, stale)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def restore(self, key, path, data, size, fetched_at):
+        """
+        Put back an entry loaded from a snapshot, unless a newer one is cached.
+        It keeps its original expiry, but stays servable for at least one stale
+        window from now so it can be answered from and revalidated instead of
+        refetched on the command path.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.fetched_at >= fetched_at:
+            return
+        self.store(key, path, data, size, fetched_at)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.stale_until = max(entry.stale_until, time.time() + self.ttl_for(path)[1])
+
+    def _evict(self, key):
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import time
+
+from config import config
+
+# Only catalog-like endpoints are worth keeping across restarts
+PERSISTED_PREFIXES = ('/genre/', '/configuration', '/movie/popular', '/tv/popular', '/discover/')
+
+
+class CatalogStore:
+    """
+    SQLite snapshot of TMDB catalog responses (genres, image configuration,
+    popular lists and per-genre discover pages) with the time each one was fetched.
+    A restarted bot loads it back into the response cache and answers its
+    first commands from disk while the cache revalidates in the background.
+    The file is opened in WAL mode so several shard processes can share it,
+    with a lease table electing the single process that refreshes it.
+    Params
+        - path -> SQLite file location
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the store from CATALOG_PATH, or return None when it is not set
+        """
+        return cls(config.catalog_path) if config.catalog_path else None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, path TEXT NOT NULL, body BLOB NOT NULL, fetched_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def persists(path):
+        return path.startswith(PERSISTED_PREFIXES)
+
+    def save(self, key, path, body, fetched_at=None):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, path, body, fetched_at) VALUES (?, ?, ?, ?)',
+                (key, path, body, fetched_at or time.time()),
+            )
+            conn.commit()
+
+    def load(self, since=0):
+        """
+        Read saved responses
+        Params
+            - since -> only responses fetched after this timestamp
+        Returns
+            - list of (key, path, body, fetched_at)
+        """
+        with self._lock:
+            return self._connect().execute(
+                'SELECT key, path, body, fetched_at FROM responses WHERE fetched_at > ?', (since,)
+            ).fetchall()
+
+    def get(self, key):
+        """
+        Read one saved response
+        Returns
+            - (path, body, fetched_at), or None
+        """
+        with self._lock:
+            return self._connect().execute(
+                'SELECT path, body, fetched_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+
+    def acquire_lease(self, name, owner, ttl):
+        """
+        Take or renew a named lease, it is granted when free, expired or already ours
+        Returns
+            - True if owner holds the lease
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+                'WHERE leases.owner = excluded.owner OR leases.expires_at < ?',
+                (name, owner, now + ttl, now),
+            )
+            conn.commit()
+            row = conn.execute('SELECT owner FROM leases WHERE name = ?', (name,)).fetchone()
+        return row is not None and row[0] == owner
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,93 @@
+import os
+
+from dotenv import load_dotenv
+
+DEFAULT_TMDB_BASE_URL = 'https://api.themoviedb.org/3'
+
+
+class ConfigError(Exception):
+    pass
+
+
+class Config:
+    """
+    Settings read once from the environment and a .env file, before any
+    module that depends on them is imported. Reading never fails, so tools
+    like the benchmarks can import the bot without Discord credentials;
+    validate() is called before the bot connects.
+    Params
+        - env -> mapping to read, defaults to os.environ
+    """
+
+    def __init__(self, env=None):
+        env = os.environ if env is None else env
+        self.problems = []
+        self.discord_token = env.get('DISCORD_TOKEN') or None
+        self.tmdb_api_key = env.get('TMDB_API_KEY') or None
+        self.tmdb_base_url = env.get('TMDB_BASE_URL') or DEFAULT_TMDB_BASE_URL
+        self.catalog_path = env.get('CATALOG_PATH') or None
+        self.history_path = env.get('HISTORY_PATH') or None
+        self.pool_pages = self._number(env, 'POOL_PAGES', 25)
+        self.metrics_port = self._number(env, 'METRICS_PORT', None)
+        self.command_deadline = self._number(env, 'COMMAND_DEADLINE', 2.5, float)
+        self.prefix_commands = env.get('PREFIX_COMMANDS', '1') != '0'
+        self.shard_count = self._number(env, 'SHARD_COUNT', None)
+        self.shard_ids = self._shard_ids(env, self.shard_count)
+
+    def _number(self, env, name, default, type=int):
+        value = env.get(name)
+        if not value:
+            return default
+        try:
+            number = type(value)
+        except ValueError:
+            number = 0
+        if not number > 0:
+            kind = 'whole number' if type is int else 'number'
+            self.problems.append(f'{name} must be a positive {kind}, got {value!r}')
+            return default
+        return number
+
+    def _shard_ids(self, env, shard_count):
+        """
+        Parse SHARD_IDS, eg:- '0-3,8' -> [0, 1, 2, 3, 8]
+        Returns
+            - list of shard ids, or None to run every shard
+        """
+        value = env.get('SHARD_IDS')
+        if not value:
+            return None
+        if shard_count is None:
+            # A malformed SHARD_COUNT is already reported
+            if not env.get('SHARD_COUNT'):
+                self.problems.append('SHARD_IDS needs SHARD_COUNT to be set')
+            return None
+        shard_ids = []
+        try:
+            for part in value.split(','):
+                start, _, end = part.partition('-')
+                shard_ids.extend(range(int(start), int(end or start) + 1))
+        except ValueError:
+            shard_ids = []
+        if not shard_ids or not all(0 <= shard_id < shard_count for shard_id in shard_ids):
+            self.problems.append(f'SHARD_IDS must be shard ids or ranges below SHARD_COUNT, eg:- 0-3,8, got {value!r}')
+            return None
+        return shard_ids
+
+    def validate(self):
+        """
+        Check the settings the bot can't run without
+        Raises
+            - ConfigError listing every problem found
+        """
+        problems = list(self.problems)
+        if self.discord_token is None:
+            problems.append('DISCORD_TOKEN is not set')
+        if self.tmdb_api_key is None:
+            problems.append('TMDB_API_KEY is not set')
+        if problems:
+            raise ConfigError('Invalid configuration:\n' + '\n'.join(f'- {problem}' for problem in problems))
+
+
+load_dotenv()
+config = Config()
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from contextvars import ContextVar
+
+# Set by run_command for the command being handled
+current_budget = ContextVar('current_budget', default=None)
+
+
+class Budget:
+    """
+    Time a command has to answer in, counted from when it arrived.
+    Handlers await fetches through within() and stream(), which give up once
+    it is spent and mark the budget overrun.
+    Params
+        - seconds -> eg:- 2.5
+        - start -> perf_counter() when the command arrived
+    """
+
+    def __init__(self, seconds, start=None):
+        self.seconds = seconds
+        self.expires_at = (time.perf_counter() if start is None else start) + seconds
+        self.overrun = False
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.perf_counter())
+
+
+async def within(awaitable, fallback=None):
+    """
+    Await a fetch for no longer than the current command has left.
+    TMDBClient.get shields its fetches, so one that runs late still fills the
+    cache for the next command.
+    Params
+        - fallback -> optional callable giving the best answer available without waiting, eg:- from the cache
+    Returns
+        - the awaitable's result, or fallback() once the deadline has passed
+    """
+    budget = current_budget.get()
+    if budget is None:
+        return await awaitable
+    try:
+        # Unlike wait_for this runs the fetch in the caller's task, answers from memory never leave it
+        async with asyncio.timeout(budget.remaining()):
+            return await awaitable
+    except TimeoutError:
+        budget.overrun = True
+        return fallback() if fallback is not None else None
+
+
+async def stream(answers):
+    """
+    Iterate an async generator of ever more complete answers until it is done
+    or the current command's deadline passes, whichever comes first
+    """
+    budget = current_budget.get()
+    try:
+        while True:
+            try:
+                async with asyncio.timeout(None if budget is None else budget.remaining()):
+                    answer = await answers.__anext__()
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                budget.overrun = True
+                return
+            yield answer
+    finally:
+        await answers.aclose()
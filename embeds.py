@@ -0,0 +1,83 @@
+import discord
+
+# Discord embed limits
+TITLE_LIMIT = 256
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+FIELDS_PER_EMBED = 25
+CHARS_PER_MESSAGE = 6000  # shared by every embed in a message
+EMBEDS_PER_MESSAGE = 10
+
+EMPTY_VALUE = 'No overview available.'
+
+
+def truncate(text, limit):
+    if len(text) > limit:
+        return text[:limit - 3] + '...'
+    return text
+
+
+def normalize_fields(items, name_key, value_key, value_limit=FIELD_VALUE_LIMIT):
+    """
+    Turn results into numbered embed fields, truncated once to Discord's field limits
+    Params
+        - items -> list of Title records, or any objects with the named attributes
+        - name_key -> attribute of the field name, eg:- title
+        - value_key -> attribute of the field value, eg:- overview
+        - value_limit -> max characters of a field value
+    Returns
+        - list of (name, value)
+    """
+    fields = []
+    for i, item in enumerate(items, start=1):
+        name = truncate(f"{i}. {getattr(item, name_key, None) or 'Unknown'}", FIELD_NAME_LIMIT)
+        value = truncate(getattr(item, value_key, None) or EMPTY_VALUE, value_limit)
+        fields.append((name, value))
+    return fields
+
+
+def pack_embeds(title, fields):
+    """
+    Pack fields into as few messages as Discord's limits allow
+    Params
+        - title -> title of the first embed of each message
+        - fields -> list of (name, value) already within field limits
+    Returns
+        - list of messages, each a list of embeds
+    """
+    title = truncate(title, TITLE_LIMIT)
+    messages = []
+    embeds, embed, chars = [], None, 0
+    for name, value in fields:
+        size = len(name) + len(value)
+        if embed is None or chars + size > CHARS_PER_MESSAGE or (
+                len(embed.fields) == FIELDS_PER_EMBED and len(embeds) == EMBEDS_PER_MESSAGE):
+            if embeds:
+                messages.append(embeds)
+            embed = discord.Embed(title=title, description='')
+            embeds, chars = [embed], len(title)
+        elif len(embed.fields) == FIELDS_PER_EMBED:
+            embed = discord.Embed()
+            embeds.append(embed)
+        embed.add_field(name=name, value=value, inline=False)
+        chars += size
+    if embeds:
+        messages.append(embeds)
+    return messages
+
+
+async def send_packed(channel, title, fields, sent=None):
+    """
+    Send fields to a channel in the fewest messages
+    Params
+        - sent -> optional messages of an earlier send_packed, edited in place to show the new fields
+    Returns
+        - list of the messages
+    """
+    sent = list(sent or ())
+    for i, embeds in enumerate(pack_embeds(title, fields)):
+        if i < len(sent):
+            await sent[i].edit(embeds=embeds)
+        else:
+            sent.append(await channel.send(embeds=embeds))
+    return sent
@@ -0,0 +1,210 @@
+import asyncio
+import random
+import time
+from array import array
+
+from config import config
+from records import from_details
+from search_index import search_index
+from tmdb_client import tmdb
+
+
+class GenrePools:
+    """
+    Deep per-genre pools of movie and TV ids built from many discover pages.
+    Each pool is a compact array of TMDB ids, and one table maps an id to its
+    Title record, shared by every genre the title is in, so a random pick is
+    an O(1) draw from memory instead of a network round trip on the command
+    path. The recommender indexes the same table, and every ingested title is
+    added to the search index as it arrives.
+    Params
+        - client -> TMDBClient used for discover requests
+        - pages -> discover pages fetched per genre
+        - concurrency -> max discover requests in flight while building
+        - rate -> max discover requests started per second while building
+        - max_age -> seconds before a pool is rebuilt on use, the refresh scheduler normally gets there first
+        - index -> optional SearchIndex kept up to date with the ingested titles
+    """
+
+    def __init__(self, client, pages=25, concurrency=4, rate=10, max_age=12 * 60 * 60, index=None):
+        self.client = client
+        self.index = index
+        self.pages = pages
+        self.max_age = max_age
+        self.pools = {}
+        self.built_at = {}
+        self.titles = {'movie': {}, 'tv': {}}
+        self._building = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 1 / rate
+        self._next_start = 0.0
+
+    def get(self, kind, genre_id):
+        """
+        Get the pool for a genre, scheduling a build when it is missing or old
+        Returns
+            - array of ids, or None while the pool has not been built yet
+        """
+        key = (kind, str(genre_id))
+        pool = self.pools.get(key)
+        if pool is None or time.time() - self.built_at[key] > self.max_age:
+            self.ensure(kind, genre_id)
+        return pool
+
+    def draw(self, kind, genre_id, exclude=None, tries=8):
+        """
+        Draw one random title from a genre pool
+        Params
+            - exclude -> optional predicate on an id, matching ids are redrawn up to tries times
+        Returns
+            - Title, or None if the pool is not ready
+        """
+        pool = self.get(kind, genre_id)
+        if not pool:
+            return None
+        for _ in range(tries):
+            movie_id = pool[random.randrange(len(pool))]
+            if exclude is None or not exclude(movie_id):
+                break
+        return self.titles[kind][movie_id]
+
+    def sample(self, kind, genre_id, k, exclude=None):
+        """
+        Draw k distinct random titles from a genre pool
+        Params
+            - exclude -> optional predicate on an id, matching ids are skipped while others are left
+        Returns
+            - list of Title, or None if the pool is not ready
+        """
+        pool = self.get(kind, genre_id)
+        if not pool:
+            return None
+        titles = self.titles[kind]
+        return [titles[movie_id] for movie_id in self._pick(pool, k, exclude)]
+
+    def sample_all(self, kind, genre_ids, k, exclude=None):
+        """
+        Draw k distinct random titles that are in every one of several genres,
+        filtering the smallest of their pools by genre
+        Returns
+            - list of Title, or None if any of the pools is not ready
+        """
+        found = [self.get(kind, genre_id) for genre_id in genre_ids]
+        if not all(found):
+            return None
+        wanted = {int(genre_id) for genre_id in genre_ids}
+        titles = self.titles[kind]
+        ids = [movie_id for movie_id in min(found, key=len) if wanted.issubset(titles[movie_id].genre_ids)]
+        return [titles[movie_id] for movie_id in self._pick(ids, k, exclude)]
+
+    @staticmethod
+    def _pick(ids, k, exclude=None):
+        if exclude is None:
+            return random.sample(ids, min(k, len(ids)))
+        # Look at a few times more candidates than needed, topping up with excluded ones if short
+        candidates = random.sample(ids, min(k * 4, len(ids)))
+        picks = [movie_id for movie_id in candidates if not exclude(movie_id)][:k]
+        if len(picks) < k:
+            chosen = set(picks)
+            picks += [movie_id for movie_id in candidates if movie_id not in chosen][:k - len(picks)]
+        return picks
+
+    def ensure(self, kind, genre_id, fresh=False):
+        key = (kind, str(genre_id))
+        if key in self._building:
+            return self._building[key]
+        task = asyncio.create_task(self.build(kind, genre_id, fresh))
+        self._building[key] = task
+        task.add_done_callback(lambda _: self._building.pop(key, None))
+        return task
+
+    async def build(self, kind, genre_id, fresh=False):
+        """
+        Fetch every discover page of a genre concurrently and swap in the new pool
+        Params
+            - fresh -> refetch pages from TMDB instead of reusing cached ones
+        """
+        pages = await asyncio.gather(*(self._fetch_page(kind, genre_id, page, fresh)
+                                       for page in range(1, self.pages + 1)))
+        titles = self.titles[kind]
+        ids = array('i')
+        seen = set()
+        for results in pages:
+            for result in results:
+                movie_id = result.id
+                if movie_id in seen:
+                    continue
+                seen.add(movie_id)
+                ids.append(movie_id)
+                if titles.get(movie_id) is not result and self.index is not None:
+                    self.index.add(kind, result)
+                titles[movie_id] = result
+        if ids:
+            key = (kind, str(genre_id))
+            self.pools[key] = ids
+            self.built_at[key] = time.time()
+        self._prune(kind)
+        return len(ids)
+
+    def _prune(self, kind):
+        """
+        Drop the titles no pool of a kind holds any more, eg:- ones that fell off
+        every discover page a rebuild fetched, so the table, the search index and
+        the recommender built from the table stay the size of the pools
+        Returns
+            - number of titles dropped
+        """
+        # A rebuild that came back empty kept its old pool and so its titles. Nothing awaits between
+        # ingesting and pruning, so another build can't lose titles it hasn't swapped in yet
+        held = set()
+        for (pool_kind, _), ids in self.pools.items():
+            if pool_kind == kind:
+                held.update(ids)
+        titles = self.titles[kind]
+        stale = [movie_id for movie_id in titles if movie_id not in held]
+        for movie_id in stale:
+            del titles[movie_id]
+            if self.index is not None:
+                self.index.remove(kind, movie_id)
+        return len(stale)
+
+    async def _fetch_page(self, kind, genre_id, page, fresh=False):
+        async with self._semaphore:
+            await self._wait_for_budget()
+            results = await self.client.discover(kind, genre_id, page, fresh=True) if fresh else None
+            if results is None:
+                results = await self.client.discover(kind, genre_id, page)
+        return results or []
+
+    async def _wait_for_budget(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_start)
+        self._next_start = start + self._interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def update(self, kind, result):
+        """
+        Update the metadata of a title already in the pools from a TMDB details response
+        """
+        if result['id'] not in self.titles[kind]:
+            return False
+        record = self.titles[kind][result['id']] = from_details(result)
+        if self.index is not None:
+            self.index.add(kind, record)
+        return True
+
+    async def prefetch(self, kind):
+        """
+        Build the pool of every genre TMDB lists for a kind, eg:- movie or tv
+        """
+        data = await self.client.get(f'/genre/{kind}/list')
+        if data is None:
+            return
+        for genre in data['genres']:
+            await self.ensure(kind, genre['id'])
+        print(f'Built {kind} pools for {len(data["genres"])} genres ({len(self.titles[kind])} titles)')
+
+
+pools = GenrePools(tmdb, pages=config.pool_pages, index=search_index)
@@ -0,0 +1,216 @@
+import re
+from bisect import bisect_left
+
+from tmdb_client import tmdb
+
+# Common spellings mapped to candidate TMDB genre names, the first one a kind has wins
+ALIASES = {
+    'scifi': ['Science Fiction', 'Sci-Fi & Fantasy'],
+    'sf': ['Science Fiction', 'Sci-Fi & Fantasy'],
+    'sciencefiction': ['Science Fiction', 'Sci-Fi & Fantasy'],
+    'animated': ['Animation'],
+    'anime': ['Animation'],
+    'cartoon': ['Animation'],
+    'doc': ['Documentary'],
+    'docs': ['Documentary'],
+    'documentaries': ['Documentary'],
+    'kids': ['Kids', 'Family'],
+    'children': ['Kids', 'Family'],
+    'romcom': ['Romance', 'Comedy'],
+    'romantic': ['Romance'],
+    'scary': ['Horror'],
+    'funny': ['Comedy'],
+    'historical': ['History'],
+    'musical': ['Music'],
+    'suspense': ['Thriller', 'Mystery'],
+    'tvmovie': ['TV Movie'],
+}
+MAX_FUZZY_CANDIDATES = 8
+FUZZY_THRESHOLD = 0.4
+# Typos within this many edits of a genre resolve to it, one for short names
+MAX_EDITS = 2
+
+
+def normalize(name):
+    """
+    Normalize a genre name for lookups, eg:- 'Sci-Fi & Fantasy' -> 'scifiandfantasy'
+    """
+    return re.sub(r'[^a-z0-9]', '', name.lower().replace('&', 'and'))
+
+
+def bigrams(text):
+    padded = f' {text} '
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Damerau edit distance (optimal string alignment), where swapping two
+    adjacent letters counts as one edit, eg:- 'darma' -> 'drama' is 1
+    Returns
+        - the distance, or limit + 1 once it is certain to be over limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class PrefixIndex:
+    """
+    Sorted index of normalized labels for autocomplete.
+    Every word of a label starts a key, so 'knight' finds 'The Dark Knight',
+    and a lookup is a binary search plus a short scan, cheap enough to answer
+    inside Discord's autocomplete deadline without touching the network.
+    Params
+        - labels -> iterable of display labels, eg:- genre names or movie titles
+    """
+
+    def __init__(self, labels):
+        keys = set()
+        for label in labels:
+            words = label.split()
+            for i in range(len(words)):
+                key = normalize(' '.join(words[i:]))
+                if key:
+                    # Matches from the start of the label sort before word matches
+                    keys.add((key, i > 0, label))
+        self.keys = sorted(keys)
+
+    def complete(self, text, limit=25):
+        """
+        Labels with a word starting with the text, labels starting with it first
+        """
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        start = bisect_left(self.keys, (prefix,))
+        matches = []
+        for key, inner, label in self.keys[start:]:
+            if not key.startswith(prefix):
+                break
+            matches.append((inner, len(label), label))
+        labels = []
+        for _, _, label in sorted(matches):
+            if label not in labels:
+                labels.append(label)
+                if len(labels) == limit:
+                    break
+        return labels
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class GenreTable:
+    """
+    Lookup table for one kind's genres: normalized names and aliases are
+    hashed straight to genre ids, with a bigram index as the fuzzy fallback
+    and a prefix index of the names for autocomplete.
+    Params
+        - genres -> TMDB genre list, eg:- [{'id': 28, 'name': 'Action'}]
+    """
+
+    def __init__(self, genres):
+        self.names = {g['id']: g['name'] for g in genres}
+        self.ids = {}
+        for g in genres:
+            self.ids[normalize(g['name'])] = g['id']
+        # Every part of a combined TV genre resolves to it, eg:- 'war' -> 'War & Politics'
+        for g in genres:
+            for part in re.split(r'&|/', g['name']):
+                self.ids.setdefault(normalize(part), g['id'])
+        for alias, candidates in ALIASES.items():
+            for candidate in candidates:
+                genre_id = self.ids.get(normalize(candidate))
+                if genre_id is not None:
+                    self.ids.setdefault(alias, genre_id)
+                    break
+
+        self.completions = PrefixIndex(self.names.values())
+        self.grams = {}
+        for key in self.ids:
+            for gram in bigrams(key):
+                self.grams.setdefault(gram, set()).add(key)
+
+    def lookup(self, name):
+        key = normalize(name)
+        genre_id = self.ids.get(key)
+        if genre_id is not None or not key:
+            return genre_id
+        return self._fuzzy(key)
+
+    def _fuzzy(self, key):
+        grams = bigrams(key)
+        shared = {}
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        # Ties go to candidates closest in length, the likeliest to be a typo of the key
+        candidates = sorted(shared.items(), key=lambda item: (-item[1], abs(len(item[0]) - len(key))))
+        candidates = candidates[:MAX_FUZZY_CANDIDATES]
+
+        # Swapped or mistyped letters break most bigrams of a short name, so the
+        # closest candidate by edits wins before the bigram overlap is looked at
+        limit = 1 if len(key) <= 5 else MAX_EDITS
+        best_id, best_distance = None, limit + 1
+        for candidate, _ in candidates:
+            distance = edit_distance(key, candidate, limit)
+            if distance < best_distance:
+                best_id, best_distance = self.ids[candidate], distance
+        if best_id is not None:
+            return best_id
+
+        best_score = FUZZY_THRESHOLD
+        for candidate, count in candidates:
+            score = count / len(grams | bigrams(candidate))
+            if score >= best_score:
+                best_id, best_score = self.ids[candidate], score
+        return best_id
+
+
+class GenreIndex:
+    """
+    Movie and TV genre tables built from /genre/movie/list and /genre/tv/list.
+    A table is rebuilt only when the response cache hands back a new genre list.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.tables = {}
+        self._sources = {}
+
+    async def table(self, kind):
+        data = await self.client.get(f'/genre/{kind}/list')
+        if data is None:
+            return self.tables.get(kind)
+        if self._sources.get(kind) is not data:
+            self.tables[kind] = GenreTable(data['genres'])
+            self._sources[kind] = data
+        return self.tables[kind]
+
+    async def resolve(self, name, kind='movie'):
+        """
+        Resolve a user supplied genre name to a TMDB genre id
+        Params
+            - name -> eg:- sci-fi
+            - kind -> movie or tv
+        Returns
+            - genre_id, or None if nothing matches
+        """
+        table = await self.table(kind)
+        if table is None:
+            return None
+        return table.lookup(name)
+
+
+genre_index = GenreIndex(tmdb)
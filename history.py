@@ -0,0 +1,212 @@
+import asyncio
+import math
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from config import config
+
+FILTER_BITS = 4096
+FILTER_HASHES = 3
+# Past this many marks the false positive rate climbs fast, so the filter starts over
+FILTER_CAPACITY = 600
+KINDS = {'movie': 0, 'tv': 1}
+
+
+class SeenHistory:
+    """
+    Per-user "already seen" store for no-repeat sampling.
+    Each user has a fixed-size Bloom filter over (kind, TMDB id), so a check
+    is a few bit tests and a user costs FILTER_BITS / 8 bytes however much
+    they watch. Recently active users stay in a bounded LRU in memory, and
+    filters are persisted to SQLite when a path is given. A user missing from
+    memory starts with an empty filter at once and their saved one is read in
+    a worker thread and merged in, so the event loop never waits on the disk.
+    Params
+        - path -> optional SQLite file location
+        - max_users -> filters kept in memory
+    """
+
+    def __init__(self, path=None, max_users=50_000):
+        self.path = path
+        self.max_users = max_users
+        self._filters = OrderedDict()
+        self._dirty = set()
+        self._pending = {}
+        self._conn = None
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    @classmethod
+    def from_env(cls):
+        return cls(config.history_path)
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS seen (user_id INTEGER PRIMARY KEY, marks INTEGER, bits BLOB)')
+            self._conn.commit()
+        return self._conn
+
+    def _read(self, user_id):
+        with self._lock:
+            return self._connect().execute('SELECT marks, bits FROM seen WHERE user_id = ?', (user_id,)).fetchone()
+
+    def _load(self, user_id):
+        if user_id in self._pending:
+            self._dirty.add(user_id)
+            return self._pending.pop(user_id)
+        if self.path is None or user_id in self._loading:
+            return None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            row = self._read(user_id)
+            return [row[0], bytearray(row[1])] if row is not None else None
+        task = asyncio.create_task(self._hydrate(user_id))
+        self._loading[user_id] = task
+        task.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        return None
+
+    async def _hydrate(self, user_id):
+        """
+        Merge a user's saved filter into the one they started with while it was being read
+        """
+        row = await asyncio.to_thread(self._read, user_id)
+        if row is None:
+            return
+        entry = self._pending.get(user_id) or self._filters.get(user_id)
+        if entry is None:
+            return
+        saved = row[1]
+        entry[0] = min(FILTER_CAPACITY, entry[0] + row[0])
+        entry[1] = bytearray(a | b for a, b in zip(entry[1], saved))
+        if user_id in self._filters:
+            self._dirty.add(user_id)
+
+    def _filter(self, user_id):
+        entry = self._filters.get(user_id)
+        if entry is not None:
+            self._filters.move_to_end(user_id)
+            return entry
+        entry = self._load(user_id) or [0, bytearray(FILTER_BITS // 8)]
+        self._filters[user_id] = entry
+        if len(self._filters) > self.max_users:
+            old_id, old_entry = self._filters.popitem(last=False)
+            if old_id in self._dirty:
+                self._dirty.discard(old_id)
+                self._pending[old_id] = old_entry
+        return entry
+
+    @staticmethod
+    def _bits(kind, item_id):
+        key = item_id * 2 + KINDS[kind]
+        h1 = (key * 0x9E3779B1) & 0xFFFFFFFF
+        h2 = ((key ^ 0x5BD1E995) * 0x85EBCA6B) & 0xFFFFFFFF | 1
+        return [(h1 + i * h2) % FILTER_BITS for i in range(FILTER_HASHES)]
+
+    def seen(self, user_id, kind, item_id):
+        bits = self._filter(user_id)[1]
+        return all(bits[b >> 3] & (1 << (b & 7)) for b in self._bits(kind, item_id))
+
+    def mark(self, user_id, kind, item_id):
+        entry = self._filter(user_id)
+        if entry[0] >= FILTER_CAPACITY:
+            entry[0], entry[1] = 0, bytearray(FILTER_BITS // 8)
+        bits = entry[1]
+        for b in self._bits(kind, item_id):
+            bits[b >> 3] |= 1 << (b & 7)
+        entry[0] += 1
+        # Without a file nothing is ever flushed, so there is nothing to track
+        if self.path is not None:
+            self._dirty.add(user_id)
+
+    def excluder(self, user_id, kind):
+        """
+        Predicate telling whether a user has seen an id, for GenrePools exclude
+        """
+        if user_id is None:
+            return None
+        return lambda item_id: self.seen(user_id, kind, item_id)
+
+    def choose(self, user_id, kind, results):
+        """
+        Pick a random result the user hasn't seen yet, falling back to any result, and mark it seen
+        Params
+            - results -> non-empty list of Title records
+        """
+        if user_id is None:
+            return random.choice(results)
+        unseen = [r for r in results if not self.seen(user_id, kind, r.id)]
+        choice = random.choice(unseen or results)
+        self.mark(user_id, kind, choice.id)
+        return choice
+
+    def _snapshot(self):
+        # Users whose saved filter is still being read wait for the next flush, writing
+        # their new filter now would replace the saved one before it is merged in
+        rows = [(user_id, marks, bytes(bits)) for user_id, (marks, bits) in self._pending.items()
+                if user_id not in self._loading]
+        rows += [(user_id, self._filters[user_id][0], bytes(self._filters[user_id][1]))
+                 for user_id in self._dirty if user_id in self._filters and user_id not in self._loading]
+        for user_id, _, _ in rows:
+            self._pending.pop(user_id, None)
+            self._dirty.discard(user_id)
+        return rows
+
+    @staticmethod
+    def _estimate_marks(bits):
+        """
+        Estimate how many ids a filter holds from the share of its bits that are set
+        """
+        set_bits = sum(bin(byte).count('1') for byte in bits)
+        if set_bits >= FILTER_BITS:
+            return FILTER_CAPACITY
+        return round(-FILTER_BITS / FILTER_HASHES * math.log(1 - set_bits / FILTER_BITS))
+
+    def _merge_saved(self, conn, rows):
+        """
+        OR each filter with the one already saved, shard processes sharing the
+        file each hold their own copy of a user's filter. A merge that would
+        pass FILTER_CAPACITY keeps the new filter, it has started over.
+        """
+        merged = []
+        for user_id, marks, bits in rows:
+            saved = conn.execute('SELECT bits FROM seen WHERE user_id = ?', (user_id,)).fetchone()
+            if saved is not None:
+                union = bytes(a | b for a, b in zip(bits, saved[0]))
+                estimate = self._estimate_marks(union)
+                if estimate < FILTER_CAPACITY:
+                    marks, bits = max(marks, estimate), union
+            merged.append((user_id, marks, bits))
+        return merged
+
+    def _write(self, rows):
+        with self._lock:
+            conn = self._connect()
+            conn.executemany('INSERT OR REPLACE INTO seen (user_id, marks, bits) VALUES (?, ?, ?)',
+                             self._merge_saved(conn, rows))
+            conn.commit()
+
+    def flush(self):
+        """
+        Write dirty and evicted filters to SQLite
+        """
+        if self.path is not None:
+            self._write(self._snapshot())
+
+    async def flush_periodically(self, interval=60):
+        """
+        Persist changed filters every interval seconds, writing off the event loop
+        """
+        if self.path is None:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            if self._dirty or self._pending:
+                await asyncio.to_thread(self._write, self._snapshot())
+
+
+history = SeenHistory.from_env()
@@ -0,0 +1,194 @@
+import asyncio
+import random
+
+from genre_pool import pools
+from history import history
+from tmdb_client import discover_query, tmdb
+
+
+def sample(kind, genre_id, k=20, user_id=None):
+    """
+    Sample titles of a genre from its in-memory pool
+    Params
+        - kind -> movie or tv
+        - user_id -> optional, titles this user has already seen are avoided and the sample is marked seen
+    Returns
+        - list of Title, or None if the pool isn't built yet
+    """
+    sampled = pools.sample(kind, genre_id, k, exclude=history.excluder(user_id, kind))
+    if sampled is None:
+        return None
+    if user_id is not None:
+        for record in sampled:
+            history.mark(user_id, kind, record.id)
+    return sampled
+
+
+def cached(kind, genre_ids):
+    """
+    The best titles in every one of the given genres that are at hand without
+    waiting on TMDB: their first discover page however old it is, else the
+    cached popular titles that are in those genres
+    Params
+        - genre_ids -> list of genre ids, one for a plain genre
+    Returns
+        - list of Title, empty when nothing suitable is cached
+    """
+    data = tmdb.cached(*discover_query(kind, ','.join(map(str, genre_ids))))
+    if data is not None:
+        return data.get('results', [])
+    data = tmdb.cached(f'/{kind}/popular')
+    if data is None:
+        return []
+    return [r for r in data.get('results', []) if all(genre_id in r.genre_ids for genre_id in genre_ids)]
+
+
+async def pick(kind, genre_id=None, user_id=None):
+    """
+    Pick one title to recommend, from the genre pool when it is built and from
+    one page of TMDB results otherwise
+    Params
+        - kind -> movie or tv
+        - genre_id -> optional, a popular title is picked without it
+        - user_id -> optional, titles this user has already seen are avoided
+    Returns
+        - Title, or None
+    """
+    if genre_id is not None:
+        drawn = pools.draw(kind, genre_id, exclude=history.excluder(user_id, kind))
+        if drawn is not None:
+            if user_id is not None:
+                history.mark(user_id, kind, drawn.id)
+            return drawn
+        results = await tmdb.discover(kind, genre_id)
+    else:
+        results = await tmdb.popular(kind)
+
+    if results is None:
+        print(f'Error while fetching a {kind} to recommend')
+        return None
+    if not results:
+        return None
+    return history.choose(user_id, kind, results)
+
+
+def pick_cached(kind, genre_id=None, user_id=None):
+    """
+    Pick one title to recommend from what is cached, for when fetching takes too long
+    Returns
+        - Title, or None
+    """
+    if genre_id is not None:
+        results = cached(kind, [genre_id])
+    else:
+        data = tmdb.cached(f'/{kind}/popular')
+        results = data.get('results', []) if data is not None else []
+    return history.choose(user_id, kind, results) if results else None
+
+
+async def browse(kind, genre_id, user_id=None):
+    """
+    Ever better lists of titles of a genre, for handlers answering under a
+    deadline. A built pool answers at once. Otherwise the best cached titles
+    come first and one fetched page of TMDB results follows.
+    Yields
+        - list of Title
+    """
+    sampled = sample(kind, genre_id, user_id=user_id)
+    if sampled is not None:
+        yield sampled
+        return
+
+    early = cached(kind, [genre_id])
+    if early:
+        yield early
+    results = await tmdb.discover(kind, genre_id)
+    if results is None:
+        print(f'Error while fetching {kind} by genre ID')
+    elif results and results is not early:
+        yield results
+
+
+async def candidates(kind, genre_ids, k, user_id=None):
+    """
+    Up to k random titles in every one of the given genres, unseen ones first.
+    They come from the genre pools when those are built and from one TMDB
+    discover page otherwise. Nothing is marked seen.
+    Params
+        - genre_ids -> list of genre ids, one for a plain genre
+    Returns
+        - list of Title, or None if TMDB couldn't be reached
+    """
+    exclude = history.excluder(user_id, kind)
+    if len(genre_ids) == 1:
+        sampled = pools.sample(kind, genre_ids[0], k, exclude=exclude)
+    else:
+        sampled = pools.sample_all(kind, genre_ids, k, exclude=exclude)
+    if sampled is not None:
+        return sampled
+
+    # TMDB reads comma separated genres as titles in all of them
+    results = await tmdb.discover(kind, ','.join(map(str, genre_ids)))
+    if results is None:
+        print(f'Error while fetching {kind} by genre IDs {genre_ids}')
+        return None
+    results = random.sample(results, len(results))
+    if exclude is not None:
+        results.sort(key=lambda r: exclude(r.id))
+    return results[:k]
+
+
+async def bulk(kind, groups, count, user_id=None):
+    """
+    Recommend titles for several genres at once. Every group is fetched
+    concurrently and an answer is yielded each time more groups arrive, so
+    the first one is ready as soon as the fastest group is. Meanwhile groups
+    still being fetched show their best cached titles. A title is recommended
+    only once across groups, the group that arrives first keeps it.
+    Params
+        - groups -> list of genre id lists, a title has to be in every genre of its group
+        - count -> titles per group
+        - user_id -> optional, titles this user has already seen are avoided and the picks are marked seen
+    Yields
+        - list with the titles of each group, None for a group TMDB couldn't be reached for
+    """
+    # Spares so a group can skip titles another group already took
+    k = count * len(groups)
+    pending = {asyncio.ensure_future(candidates(kind, genre_ids, k, user_id)): i for i, genre_ids in enumerate(groups)}
+    picked = [None] * len(groups)
+    taken = set()
+
+    def take(results, skip):
+        group = []
+        for record in results:
+            if record.id not in skip:
+                skip.add(record.id)
+                group.append(record)
+                if len(group) == count:
+                    break
+        return group
+
+    try:
+        # One turn of the loop lets the groups served from the pools finish
+        await asyncio.sleep(0)
+        done = {task for task in pending if task.done()}
+        while True:
+            for task in done:
+                i = pending.pop(task)
+                results = task.result()
+                if results is not None:
+                    picked[i] = take(results, taken)
+                    if user_id is not None:
+                        for record in picked[i]:
+                            history.mark(user_id, kind, record.id)
+            if not pending:
+                yield picked
+                return
+            shown = set(taken)
+            waiting = set(pending.values())
+            yield [take(cached(kind, groups[i]), shown) if i in waiting else group for i, group in enumerate(picked)]
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Fetches of groups cut off by a deadline carry on in the client and fill the cache
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,170 @@
+import asyncio
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Phase timings of the command running in the current task, set by on_message
+current_timer = ContextVar('current_timer', default=None)
+
+
+def endpoint_label(path):
+    """
+    Collapse ids out of a TMDB path so it can be a label, eg:- /movie/550 -> /movie/{id}
+    """
+    return re.sub(r'/\d+', '/{id}', path)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms keyed by name and label values.
+    Recording is a dict lookup and a couple of additions, cheap enough to leave
+    on in production. Gauges are callables read at render time.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.last_loop_lag = 0.0
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def gauge(self, name, read):
+        self.gauges[name] = read
+
+    def counter_total(self, name, **match):
+        return sum(value for (n, labels), value in self.counters.items()
+                   if n == name and all(dict(labels).get(k) == v for k, v in match.items()))
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format
+        """
+        lines = []
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f'{name}{_labels(labels)} {value}')
+        for name, read in sorted(self.gauges.items()):
+            lines.append(f'{name} {read()}')
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+            lines.append(f'{name}_sum{_labels(labels)} {histogram.sum}')
+            lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class CommandTimer:
+    __slots__ = ('send', 'sends')
+
+    def __init__(self):
+        self.send = 0.0
+        self.sends = 0
+
+
+@contextmanager
+def timed_send():
+    """
+    Count the time spent in a Discord send towards the current command's send phase
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = current_timer.get()
+        if timer is not None:
+            timer.send += time.perf_counter() - start
+            timer.sends += 1
+
+
+async def monitor_loop_lag(interval=0.5):
+    """
+    Measure how late the event loop wakes a sleeping task
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        metrics.observe('moviebot_event_loop_lag_seconds', lag)
+        metrics.last_loop_lag = lag
+
+
+async def serve_metrics(port, host='127.0.0.1'):
+    """
+    Serve the metrics as Prometheus text on http://host:port/metrics
+    Returns
+        - the AppRunner, or None if the port couldn't be bound
+    """
+    # The server side of aiohttp is only loaded when metrics are served
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.render(), content_type='text/plain')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Metrics are optional, a taken port mustn't keep the bot from warming up
+        print(f'Could not serve metrics on {host}:{port}:', repr(e))
+        await runner.cleanup()
+        return None
+    print(f'Serving metrics on http://{host}:{port}/metrics')
+    return runner
+
+
+metrics = Metrics()
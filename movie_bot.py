@@ -1,278 +1,538 @@
-import discord
-import requests
-import random
-import json
 import time
-import os
-from dotenv import load_dotenv
+# Time to ready is measured from here, before the heavier imports
+STARTED = time.perf_counter()
 
-from tv_shows import fetch_tv_shows, fetch_tv_shows_by_genre
+import asyncio
+import discord
+import re
+import sys
+from discord import app_commands
+
+from admission import AdmissionControl
+from config import ConfigError, config
+from deadline import Budget, current_budget, stream, within
+from embeds import EMPTY_VALUE, FIELD_NAME_LIMIT, send_packed, truncate
+from genre_pool import pools
+from genres import genre_index
+from history import history
+import media
+from metrics import CommandTimer, current_timer, metrics, monitor_loop_lag, serve_metrics, timed_send
+from pagination import ResultsView
+from posters import posters
+from rate_limit import current_guild
+from recommender import recommender
+from router import Argument, CommandRouter
+from search_index import search_index
+from scheduler import CatalogRefresher, RefreshScheduler
+from sharding import Leadership, make_client
+from slash import register_commands
+from tmdb_client import tmdb
 
-# Keys
-load_dotenv()
-token = os.getenv('DISCORD_TOKEN')
 intents = discord.Intents.default()
-intents.message_content = True
-client = discord.Client(intents=intents)
-
-GENRE_LIST = None
+# Prefix commands need every message's content, slash commands need no message events at all
+intents.message_content = config.prefix_commands
+intents.guild_messages = intents.dm_messages = config.prefix_commands
+client = make_client(intents)
+tree = app_commands.CommandTree(client)
+router = CommandRouter(prefix='!')
+admission = AdmissionControl()
+leadership = Leadership(tmdb.store)
+scheduler = RefreshScheduler()
+
+BACKGROUND_TASKS = set()
+metrics.gauge('moviebot_cache_hit_ratio', lambda: tmdb.cache.hit_ratio)
+metrics.gauge('moviebot_cache_bytes', lambda: tmdb.cache.size)
+metrics.gauge('moviebot_event_loop_lag_last_seconds', lambda: metrics.last_loop_lag)
+metrics.gauge('moviebot_admission_rejected_total', lambda: admission.rejected)
+metrics.gauge('moviebot_tmdb_limiter_waiting', lambda: tmdb.limiter.waiting)
+metrics.gauge('moviebot_tmdb_open_circuits', lambda: len(tmdb.breakers.open_endpoints()))
+WARMED_UP = False
+# perf_counter() readings of the startup phases, see report_ready
+STARTUP = {}
+# Commands answered quickly, or with a first answer already sent, don't show typing
+TYPING_AFTER = 0.25
+CATALOG_SYNC_INTERVAL = 60
+# Bulk recommendations, eg:- !recommend action,comedy+horror x3
+BULK_COUNT = re.compile(r'(?:^|\s)x(\d+)$')
+MAX_BULK_GROUPS = 5
+# get_genre_id result when no genre table could be loaded in time, as opposed to an unknown genre
+GENRES_UNAVAILABLE = object()
+TMDB_SLOW_REPLY = 'Sorry, TMDB is slow to answer right now, please try again in a moment'
+MAX_BULK_COUNT = 5
+BULK_OVERVIEW_LIMIT = 180
+
+
+def run_in_background(coro):
+    """
+    Schedule a coroutine on the loop and keep a reference until it finishes
+    """
+    task = asyncio.create_task(coro)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    return task
 
 @client.event
 async def on_ready():
+    STARTUP.setdefault('connected', time.perf_counter())
     print(f'Logged in as {client.user.name} ({client.user.id})') # type: ignore
+    # on_ready fires again after reconnects, warm up only once
+    global WARMED_UP
+    if not WARMED_UP:
+        WARMED_UP = True
+        run_in_background(warm_up())
+
+
+async def warm_up():
+    """
+    Get the bot ready for commands, then build what makes them fast.
+    The first phase opens TMDB connections and loads the genre tables, poster
+    sizes and popular lists all at once, after which every command can be
+    answered. Time to ready is reported at that point. The second phase
+    builds the movie and TV genre pools, indexes them for recommendations and
+    hands them over to the refresh scheduler.
+    When shard processes share a catalog store only the elected leader refreshes it,
+    followers wait for its catalog and keep pulling new responses from the store.
+    """
+    run_in_background(monitor_loop_lag())
+    if config.metrics_port:
+        await serve_metrics(config.metrics_port)
+    await leadership.campaign()
+    on_leadership_change(leadership.is_leader)
+    run_in_background(leadership.keep_campaigning(on_leadership_change))
+    await load_catalog_snapshot()
+    if tmdb.store is not None:
+        run_in_background(sync_catalog_snapshot())
+        if not leadership.is_leader:
+            await wait_for_leader_catalog()
+    run_in_background(history.flush_periodically())
+    if leadership.is_leader:
+        run_in_background(sync_commands())
+    await asyncio.gather(
+        tmdb.preconnect(),
+        genre_index.table('movie'),
+        genre_index.table('tv'),
+        posters.load(),
+        tmdb.popular('movie'),
+        tmdb.popular('tv'),
+    )
+    report_ready()
+
+    await pools.prefetch('movie')
+    await pools.prefetch('tv')
+    indexed = await recommender.rebuild()
+    print(f'Recommender indexed {indexed} movies')
+    CatalogRefresher(lambda: leadership.is_leader).schedule(scheduler)
+    scheduler.start()
+
+
+def report_ready():
+    """
+    Print and export how long the process took to get ready for commands, split into
+    imports, connecting to Discord and warming up
+    """
+    STARTUP['ready'] = now = time.perf_counter()
+    imported = STARTUP.get('imported', STARTED)
+    connected = STARTUP.get('connected', imported)
+    ready = now - STARTED
+    metrics.gauge('moviebot_startup_ready_seconds', lambda: ready)
+    print(f'Ready for commands {ready:.2f}s after start (imports {imported - STARTED:.2f}s, '
+          f'connecting {connected - imported:.2f}s, warm up {now - connected:.2f}s)')
+
+
+async def sync_commands():
+    """
+    Publish the slash commands to Discord, done by one process when several run
+    """
+    if client.application_id is None:
+        return
+    try:
+        synced = await tree.sync()
+        print(f'Synced {len(synced)} slash commands')
+    except discord.HTTPException as e:
+        print('Error while syncing slash commands:', repr(e))
+
+
+async def load_catalog_snapshot():
+    """
+    Warm the response cache from the on-disk catalog, if one is configured.
+    Stale entries are served right away and refreshed in the background.
+    """
+    restored = await tmdb.load_snapshot()
+    if restored:
+        print(f'Loaded {restored} cached TMDB responses from the catalog snapshot')
+
+
+def on_leadership_change(is_leader):
+    tmdb.revalidate = is_leader
+    print('This process refreshes the catalog' if is_leader else 'Following the catalog refresher')
+
+
+async def sync_catalog_snapshot():
+    """
+    Followers pull responses the leader saved into their own cache
+    """
+    while True:
+        await asyncio.sleep(CATALOG_SYNC_INTERVAL)
+        if not leadership.is_leader:
+            await tmdb.load_snapshot()
+
+
+async def wait_for_leader_catalog(timeout=120, interval=5):
+    """
+    Give the leader time to fetch the genre lists so followers don't repeat its cold start
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while '/genre/tv/list' not in tmdb.cache and loop.time() < deadline:
+        await asyncio.sleep(interval)
+        await tmdb.load_snapshot()
 
 @client.event
 async def on_message(message):
-    if message.author == client.user:
+    start = time.perf_counter()
+    route = router.resolve(message.content)
+    if route is None or message.author == client.user:
         return 
-    
-    if message.content.startswith('!test'):
-        channel = message.channel
-        await channel.send('Bot is working!')
-    
-    if message.content.startswith('!help'):
-        await show_help(message)
-
-    if message.content.startswith('!recommend'):
-        if message.content.startswith('!recommend list'):
-            await recommend_movie_list(message)
-        elif message.content.startswith('!recommend tv'):
-            await recommend_tv_show_list(message)
-        else:
-            await recommend_movie(message)
+    await run_command(message, route, start)
+
+
+async def run_command(message, route, start):
+    """
+    Run a routed command, prefix or slash, behind admission control and time its phases.
+    The handler gets COMMAND_DEADLINE seconds to answer in, and the channel shows
+    typing while it runs for longer than TYPING_AFTER.
+    Params
+        - message -> discord.Message, or a slash.InteractionMessage
+        - route -> (command, kwargs)
+        - start -> perf_counter() when the command arrived
+    Returns
+        - None once it ran, or USER_BUSY or CHANNEL_BUSY from admission.py when admission control turned it away
+    """
+    ticket = admission.admit(message.author.id, message.channel.id, ' '.join(message.content.lower().split()))
+    if ticket is None:
+        return admission.last_rejection
+    parsed = time.perf_counter()
+    timer = CommandTimer()
+    budget = Budget(config.command_deadline, start)
+    with ticket:
+        current_guild.set(message.guild.id if message.guild else None)
+        current_timer.set(timer)
+        current_budget.set(budget)
+        typing = None
+
+        def start_typing():
+            nonlocal typing
+            if not timer.sends:
+                typing = asyncio.create_task(show_typing(message.channel))
+        typing_timer = asyncio.get_running_loop().call_later(TYPING_AFTER, start_typing)
+        try:
+            await router.dispatch(message, route)
+        finally:
+            typing_timer.cancel()
+            if typing is not None:
+                typing.cancel()
+            # Whatever isn't parsing or sending a reply is fetching
+            command = ' '.join(route[0].path)
+            if budget.overrun or time.perf_counter() - start > budget.seconds:
+                metrics.inc('moviebot_command_deadline_overruns_total', command=command)
+            handled = time.perf_counter() - parsed
+            metrics.inc('moviebot_commands_total', command=command)
+            metrics.observe('moviebot_command_seconds', parsed - start, command=command, phase='parse')
+            metrics.observe('moviebot_command_seconds', handled - timer.send, command=command, phase='fetch')
+            metrics.observe('moviebot_command_seconds', timer.send, command=command, phase='send')
+            metrics.observe('moviebot_command_total_seconds', time.perf_counter() - start, command=command)
+    return None
+
+
+def overran():
+    """
+    Whether the command being handled gave up waiting on TMDB, so finding
+    nothing means TMDB was slow rather than that nothing matched
+    """
+    budget = current_budget.get()
+    return budget is not None and budget.overrun
+
+
+async def show_typing(channel):
+    """
+    Show the typing indicator in a channel until cancelled, best effort
+    """
+    try:
+        async with channel.typing():
+            await asyncio.Event().wait()
+    except discord.HTTPException as e:
+        print('Error while showing the typing indicator:', repr(e))
+
+
+async def reply(message, *args, **kwargs):
+    """
+    Send to the message's channel, timing it as the command's send phase
+    """
+    with timed_send():
+        return await message.channel.send(*args, **kwargs)
+
 
+@router.command('test')
+async def test_bot(message):
+    await reply(message, 'Bot is working!')
 
-async def recommend_movie(message):
+
+@router.command('stats')
+async def show_stats(message):
+    """
+    Admin only summary of command latency, TMDB traffic, cache hit ratio and event loop lag
+    """
+    permissions = getattr(message.author, 'guild_permissions', None)
+    if permissions is None or not permissions.administrator:
+        await reply(message, 'Sorry, !stats is only available to server administrators')
+        return
+
+    lines = ['Command latency (p50 / p99):']
+    for (name, labels), histogram in sorted(metrics.histograms.items()):
+        if name == 'moviebot_command_total_seconds':
+            command = dict(labels)['command']
+            lines.append(f'- !{command}: {histogram.count} runs, '
+                         f'{histogram.quantile(0.5) * 1000:g} / {histogram.quantile(0.99) * 1000:g} ms')
+    lines.append(f"TMDB requests: {metrics.counter_total('moviebot_tmdb_requests_total')}, "
+                 f"retries: {metrics.counter_total('moviebot_tmdb_retries_total')}")
+    lines.append(f"Open TMDB circuits: {', '.join(tmdb.breakers.open_endpoints()) or 'none'}")
+    lines.append(f'Cache hit ratio: {tmdb.cache.hit_ratio:.1%} ({len(tmdb.cache)} entries, {tmdb.cache.size} bytes)')
+    lines.append(f'Event loop lag: {metrics.last_loop_lag * 1000:.1f} ms')
+    lines.append(f'Rejected commands: {admission.rejected}')
+    lines.append(f"Deadline overruns: {metrics.counter_total('moviebot_command_deadline_overruns_total')}")
+    if 'ready' in STARTUP:
+        lines.append(f"Ready for commands {STARTUP['ready'] - STARTED:.1f}s after start")
+    await reply(message, '\n'.join(lines))
+
+
+@router.command('recommend', args=[Argument('genre', rest=True)], usage='!recommend <genre>')
+async def recommend_movie(message, genre):
     """
     Function to recommend a single movie either random or by genre
     Params 
         - message -> eg:- !recommend action
+        - genre -> genre name or random
     Returns
         - A movie recommendation on the discord channel 
     """
-    genre = message.content.split(' ')[1]
-    if genre.lower() == 'random':
-        movie_data = fetch_random_movie()
-    else:
-        genre_id = get_genre_id(genre)
+    bulk = parse_bulk(genre)
+    if bulk is not None:
+        await recommend_bulk(message, *bulk)
+        return
+
+    genre_id = None
+    if genre.lower() != 'random':
+        genre_id = await get_genre_id(genre)
+        if genre_id is GENRES_UNAVAILABLE:
+            await reply(message, TMDB_SLOW_REPLY)
+            return
         if genre_id is None:
-            await message.channel.send("Sorry, I couldn't find the genre ID for the specified genre")
+            await reply(message, "Sorry, I couldn't find the genre ID for the specified genre")
             return 
-        movie_data = fetch_movie_by_genre_id(genre_id)
+    # Past the deadline a cached title is better than keeping the user waiting
+    movie_data = await within(media.pick('movie', genre_id, message.author.id),
+                              fallback=lambda: media.pick_cached('movie', genre_id, message.author.id))
 
     if movie_data is None:
-        await message.channel.send("Sorry, I couldn't find a recommendation at the moment")
+        await reply(message, TMDB_SLOW_REPLY if overran() else "Sorry, I couldn't find a recommendation at the moment")
         return
-    
-    try: 
-        # Extract info
-        title = movie_data['title']
-        overview = movie_data['overview']
-        poster_url = movie_data['poster_url']
-
-        # Send recommendation
-        rec = discord.Embed(title=title, description=overview)
+
+    # Send recommendation
+    rec = discord.Embed(title=movie_data.title, description=movie_data.overview)
+    poster_url = posters.url(movie_data.poster_path)
+    if poster_url is not None:
         rec.set_image(url=poster_url)
-        await message.channel.send(embed=rec)
-    except KeyError:
-        await message.channel.send('Sorry, There was an issue with movie recommendation. Please Try again later.')
+    await reply(message, embed=rec)
 
 
-async def recommend_movie_list(message):
+def parse_bulk(text):
     """
-    Function to recommend a list of movies by genre
+    Split a bulk recommendation request into genre groups and a count per group
     Params
-        - message -> eg:- !recommend list action
+        - text -> eg:- action,comedy+horror x3, + joins genres a title has to be in together
     Returns
-        - A recommend list of movies by that genre
+        - ([['action'], ['comedy', 'horror']], 3), or None for a single genre
     """
-    genre = message.content.split(' ')[2]
-    genre_id = get_genre_id(genre)
-    if genre_id is None:
-        await message.channel.send("Sorry, I couldn't find any recommendations for that genre")
-        return
-    movie_data = fetch_movies_by_genre(genre_id)
-
-    if movie_data is None or not movie_data:
-        await message.channel.send("Sorry, I couldn't find any recommendations for this genre")
-        return
-
-    try:
-        embed = discord.Embed(title=f'Movie recommmendations for {genre}', description="")
-        for i, movie in enumerate(movie_data, start=1):
-            title = movie['title']
-            overview = movie['overview']
-            if len(overview) > 2000:
-                overview = overview[:1997] + '...'
-            embed.add_field(name=f"{i}. {title}", value=overview, inline=False)
-            if i % 10 == 0:
-                await message.channel.send(embed=embed)
-                embed.clear_fields()
-        
-        if len(embed.fields) > 0:
-            await message.channel.send(embed=embed)
-
-    except KeyError:
-        await message.channel.send('Sorry, there was an issue with the movie recommendation. Please try again later')
-
-
-def fetch_random_movie():
-    """
-    Fetch a random movie recommendation using TMDB API
-    """
-    api_key = os.getenv('TMDB_API_KEY')
-    url = f'https://api.themoviedb.org/3/movie/popular?api_key={api_key}'
-    
-    try:
-        retries = 3
-        for i in range(retries):
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                results = data['results']
-                random_movie = random.choice(results)
-                movie_data = {
-                    'title': random_movie['title'],
-                    'overview': random_movie['overview'],
-                    'poster_url': f"https://image.tmdb.org/t/p/original/{random_movie['poster_path']}"
-                }
-            
-                return movie_data
-            else:
-                if i < retries - 1:
-                    time.sleep(1)
-                    continue
-                else:
-                    print('Error while fetching random movie: ')
-                    return None
-    except requests.exceptions.RequestException as e:
-        print('Error while fetching random movie: ', str(e))
+    text = text.strip().lower()
+    count = 1
+    match = BULK_COUNT.search(text)
+    if match is not None:
+        count = int(match.group(1))
+        text = text[:match.start()]
+    elif ',' not in text and '+' not in text:
         return None
+    groups = [[name.strip() for name in part.split('+') if name.strip()] for part in text.split(',')]
+    return [group for group in groups if group], count
 
 
-def fetch_genre_list():
+async def recommend_bulk(message, groups, count):
     """
-    Fetch Genre list from the TMDB database.
+    Recommend count movies for each genre group in one message, eg:- !recommend action,comedy x3
     """
-    api_key = os.getenv('TMDB_API_KEY')
-    url = f'https://api.themoviedb.org/3/genre/movie/list?api_key={api_key}'
-    try:
-        retries = 3
-        for attempt in range(retries):
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return data['genres']
-            else:
-                if attempt < retries - 1:
-                    time.sleep(1)
-                    continue
-                else:
-                    print(f"Error while fetching genre list: {response.status_code}")
-                    return None
-    except requests.exceptions.RequestException as e:
-        print('Error occurred while fetching genre list:', str(e))
-        return None
+    if not groups or len(groups) > MAX_BULK_GROUPS or not 1 <= count <= MAX_BULK_COUNT:
+        await reply(message, f'Bulk recommendations take up to {MAX_BULK_GROUPS} genres and up to x{MAX_BULK_COUNT}, '
+                             'eg:- !recommend action,comedy+horror x3')
+        return
 
+    names = list(dict.fromkeys(name for group in groups for name in group))
+    genre_ids = dict(zip(names, await asyncio.gather(*(get_genre_id(name) for name in names))))
+    if GENRES_UNAVAILABLE in genre_ids.values():
+        await reply(message, TMDB_SLOW_REPLY)
+        return
+    unknown = [name for name in names if genre_ids[name] is None]
+    if unknown:
+        await reply(message, f"Sorry, I couldn't find the genre ID for {', '.join(unknown)}")
+        return
 
-def get_genre_id(genre):
+    # The first groups in are sent at once and the message is edited as the rest arrive
+    labels = [' + '.join(group) for group in groups]
+    title = f"Movie recommendations for {', '.join(labels)}"
+    answers = media.bulk('movie', [[genre_ids[name] for name in group] for group in groups], count, message.author.id)
+    sent = None
+    async for picked in stream(answers):
+        fields = []
+        for label, titles in zip(labels, picked):
+            for record in titles or ():
+                fields.append((truncate(f'{len(fields) + 1}. {record.title} ({label})', FIELD_NAME_LIMIT),
+                               truncate(record.overview or EMPTY_VALUE, BULK_OVERVIEW_LIMIT)))
+        if fields:
+            with timed_send():
+                sent = await send_packed(message.channel, title, fields, sent)
+    if sent is None:
+        await reply(message, TMDB_SLOW_REPLY if overran() else
+                    "Sorry, I couldn't find any recommendations for these genres")
+
+
+@router.command('recommend list', args=[Argument('genre', rest=True)], usage='!recommend list <genre>')
+async def recommend_movie_list(message, genre):
     """
-    Get genre id from the genre list function
+    Function to recommend a list of movies by genre
     Params
-        - genre
+        - message -> eg:- !recommend list action
+        - genre -> genre name
     Returns
-        - genre_id
-    """
-    global GENRE_LIST
-    
-    if GENRE_LIST is None:
-        GENRE_LIST = fetch_genre_list()
-    if GENRE_LIST is not None:
-        genre_l = genre.lower()
-        print("Available Genres:", [g['name'] for g in GENRE_LIST])
-        for g in GENRE_LIST:
-            if g['name'].lower() == genre_l:
-                return g['id']
-    print("Genre ID not found for:", genre)  # Debugging statement
-    return None
+        - A recommend list of movies by that genre
+    """
+    genre_id = await get_genre_id(genre)
+    if genre_id is GENRES_UNAVAILABLE:
+        await reply(message, TMDB_SLOW_REPLY)
+        return
+    if genre_id is None:
+        await reply(message, "Sorry, I couldn't find any recommendations for that genre")
+        return
+    if not await send_results(message, 'movie', genre_id, f'Movie recommendations for {genre}'):
+        await reply(message, TMDB_SLOW_REPLY if overran() else
+                    "Sorry, I couldn't find any recommendations for this genre")
 
 
-def fetch_movie_by_genre_id(genre_id):
+async def send_results(message, kind, genre_id, title):
     """
-    Fetch Movie by their genre_id
-    Args
-        - genre_id
+    Send a list of titles of a genre as soon as any are at hand. When the pool
+    isn't built, cached titles go out first and the message is edited to show
+    the fetched ones if they arrive before the deadline.
     Returns
-        movie_data -> A dict containing title, overview and poster_url for the movie
+        - False if there was nothing to send
     """
-    api_key = os.getenv('TMDB_API_KEY')
-    url = f'https://api.themoviedb.org/3/discover/movie?api_key={api_key}&with_genres={genre_id}'
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            results = data['results']
-            if results:
-                random_movie = random.choice(results)
-                movie_data = {
-                    'title': random_movie['title'],
-                    'overview': random_movie['overview'],
-                    'poster_url': f"https://image.tmdb.org/t/p/original/{random_movie['poster_path']}"
-                }
-                return movie_data
-            else:
-                return None
+    view = None
+    async for items in stream(media.browse(kind, genre_id, message.author.id)):
+        if view is None:
+            view = ResultsView(title, items, reroll=lambda: media.sample(kind, genre_id, user_id=message.author.id),
+                               author_id=message.author.id)
+            await view.send(message.channel)
         else:
-            print(f'Error while fetching movie by genre ID: {response.status_code}')
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error occurred while fetching movie by genre ID:", str(e))
-        return None
+            await view.update(items)
+    return view is not None
 
 
-def fetch_movies_by_genre(genre_id):
+async def get_genre_id(genre, kind='movie'):
     """
-    Fetch movies by genre for recommend list of movies function
+    Get genre id from the genre index
     Params
-        - genre_id
+        - genre -> eg:- action, sci-fi
+        - kind -> movie or tv
     Returns
-        - movies_data -> list of dict containing movie information
+        - genre_id, None for an unknown genre, or GENRES_UNAVAILABLE when TMDB didn't hand over
+          the genre table before the deadline
+    """
+    def from_memory():
+        table = genre_index.tables.get(kind)
+        return table.lookup(genre) if table is not None else GENRES_UNAVAILABLE
+
+    # Only slow when the genre list needs a fetch, which then goes on in the background
+    genre_id = await within(genre_index.resolve(genre, kind), fallback=from_memory)
+    if genre_id is None and kind not in genre_index.tables:
+        genre_id = GENRES_UNAVAILABLE
+    if genre_id is GENRES_UNAVAILABLE:
+        print(f'No {kind} genre table to look up {genre} in yet')
+    elif genre_id is None:
+        print("Genre ID not found for:", genre)
+    return genre_id
+
+
+@router.command('recommend like', args=[Argument('title', rest=True)], usage='!recommend like <title>')
+async def recommend_similar(message, title):
     """
-    api_key = os.getenv('TMDB_API_KEY')
-    url = f'https://api.themoviedb.org/3/discover/movie?api_key={api_key}&with_genres={genre_id}'
+    Function to recommend movies similar to a title, answered from the local recommender
+    Params
+        - message -> eg:- !recommend like inception
+        - title -> movie title
+    Returns
+        - A paginated list of similar movies
+    """
+    similar = recommender.similar(title)
+    if similar is None:
+        await reply(message, "Sorry, I don't know that movie well enough to find similar ones yet")
+        return
+    matched, movies = similar
+    view = ResultsView(f'Movies like {matched}', movies, author_id=message.author.id)
+    await view.send(message.channel)
 
-    try:
-        retries = 3
-        for i in range(retries):
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                results = data['results']
-                if results:
-                    movies_data = []
-                    for result in results:
-                        movie_data = {
-                            'title': result['title'],
-                            'overview': result['overview'],
-                            'poster_url': f"https://image.tmdb.org/t/p/original/{result['poster_path']}"
-                        }
-                        movies_data.append(movie_data)
-
-                    return movies_data
-                else:
-                    return []
-            else:
-                if i < retries - 1:
-                    time.sleep(1)
-                    continue
-                else:
-                    print('Error while fetching movies by genre ID: ')
-                    return None
-    except requests.exceptions.RequestException as e:
-        print('Error while fetching movies by genre ID: ', str(e))
-        return None 
+
+@router.command('search', args=[Argument('text', rest=True)], usage='!search <title>')
+async def search_titles(message, text):
+    """
+    Function to look up movies and TV shows by title or plot words
+    Params
+        - message -> eg:- !search dark knight
+        - text -> search query
+    Returns
+        - A paginated list of matching titles
+    """
+    results = await search(text)
+    if not results:
+        await reply(message, TMDB_SLOW_REPLY if overran() else "Sorry, I couldn't find any titles matching that")
+        return
+    view = ResultsView(f'Search results for {text}', results, author_id=message.author.id)
+    await view.send(message.channel)
 
 
+async def search(text, k=10):
+    """
+    Search the local title index, asking TMDB only when nothing matches
+    Returns
+        - list of Title
+    """
+    # Only titles matching every word count as found, looser matches go to TMDB
+    results = search_index.search(text, k=k, match_all=True)
+    if results:
+        return results
+    params = {'query': text}
+
+    def from_memory():
+        # Past the deadline a cached answer however old, else the looser local matches
+        data = tmdb.cached('/search/movie', params)
+        return data if data is not None else {'results': search_index.search(text, k=k)}
+
+    data = await within(tmdb.get('/search/movie', params), fallback=from_memory)
+    if data is None:
+        print('Error while searching movies')
+        return []
+    # Not indexed, the index only holds the pooled catalog that pool rebuilds prune.
+    # A repeated search is answered from the response cache instead
+    return data.get('results', [])[:k]
+
+
+@router.command('help')
 async def show_help(message):
     """
     Function to list all the commands for the bot 
@@ -282,40 +542,38 @@ async def show_help(message):
         "- !test: Check if the bot is working",
         "- !recommend <genre>: Get a movie recommendation for that genre",
         "- !recommend random: Get a movie recommendation by random",
+        "- !recommend <genre>,<genre> x<count>: Get several movies for several genres at once, join genres with + for movies in all of them",
         "- !recommend list <genre>: Get a list of movie recommendations by genre",
         "- !recommend tv <genre>: Get a list of TV show recommendations by genre",
-        "- !help: Show this help message"
+        "- !recommend like <title>: Get a list of movies similar to a movie",
+        "- !search <title>: Find movies and TV shows by title or plot",
+        "- !stats: Show latency and cache statistics (server administrators only)",
+        "- !help: Show this help message",
+        "The recommend commands are also available as /recommend slash commands"
     ]
     help_message = "\n".join(help_messages)
-    await message.channel.send(help_message)
+    await reply(message, help_message)
 
 
-async def recommend_tv_show_list(message):
-    genre = message.content.split(' ')[2]
-    genre_id = get_genre_id(genre)
-    if genre_id is None:
-        await message.channel.send("Sorry, I couldn't find any TV show recommendations for this genre")
+@router.command('recommend tv', args=[Argument('genre', rest=True)], usage='!recommend tv <genre>')
+async def recommend_tv_show_list(message, genre):
+    genre_id = await get_genre_id(genre, 'tv')
+    if genre_id is GENRES_UNAVAILABLE:
+        await reply(message, TMDB_SLOW_REPLY)
         return
-    tv_shows = fetch_tv_shows_by_genre(genre)
-    if not tv_shows:
-        await message.channel.send("Sorry, I couldn't find any TV show recommmendations for this genre")
+    if genre_id is None:
+        await reply(message, "Sorry, I couldn't find any TV show recommendations for this genre")
         return
-    
-    try:
-        embed = discord.Embed(title=f'TV show recommendations for {genre}', description='')
-        for i, show in enumerate(tv_shows, start=1):
-            name = show.get("name", "Unknown")
-            overview = show.get("overview", "")
-            if len(overview) > 2000:
-                overview = overview[:1997] + "..."
-            embed.add_field(name=f"{i}. {name}", value=overview, inline=False)
-            if i % 10 == 0:
-                await message.channel.send(embed=embed)
-                embed.clear_fields()
-        if len(embed.fields) > 0:
-            await message.channel.send(embed=embed)
-    except KeyError:
-        await message.channel.send("Sorry, there was an issue with the TV show recommendation. Please try again later.")
+    if not await send_results(message, 'tv', genre_id, f'TV show recommendations for {genre}'):
+        await reply(message, TMDB_SLOW_REPLY if overran() else
+                    "Sorry, I couldn't find any TV show recommmendations for this genre")
+
+register_commands(tree, router, run_command)
+STARTUP['imported'] = time.perf_counter()
 
 if __name__ == '__main__':
-    client.run(str(token))
\ No newline at end of file
+    try:
+        config.validate()
+    except ConfigError as e:
+        sys.exit(str(e))
+    client.run(config.discord_token)
\ No newline at end of file
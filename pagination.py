@@ -0,0 +1,149 @@
+import asyncio
+import random
+from collections import OrderedDict
+
+import discord
+
+from embeds import normalize_fields
+from metrics import timed_send
+from posters import posters
+
+PAGE_SIZE = 5
+PAGE_VALUE_LIMIT = 300
+VIEW_TIMEOUT = 180
+# Tasks stripping the buttons of closed views, referenced until they finish
+CLOSING_VIEWS = set()
+
+
+class CursorCache:
+    """
+    Bounded registry of live result views keyed by message id.
+    When it is full the oldest view is closed so idle cursors can't pile up.
+    Params
+        - max_views -> live views kept at once
+    """
+
+    def __init__(self, max_views=500):
+        self.max_views = max_views
+        self._views = OrderedDict()
+
+    def add(self, message_id, view):
+        self._views[message_id] = view
+        while len(self._views) > self.max_views:
+            _, oldest = self._views.popitem(last=False)
+            oldest.close()
+
+    def remove(self, message_id):
+        self._views.pop(message_id, None)
+
+    def __len__(self):
+        return len(self._views)
+
+
+cursors = CursorCache()
+
+
+class ResultsView(discord.ui.View):
+    """
+    One compact page of results with Prev/Next/Reroll buttons.
+    The view holds a cursor into the cached result set, so page turns and
+    rerolls are answered from memory by editing the same message. Each page
+    shows a small poster of its first title that has one, resolved once per
+    result set so paging back and forth reuses the same image URLs.
+    Params
+        - title -> embed title
+        - items -> list of Title records
+        - reroll -> callable returning a fresh list of Title records from memory, or None
+        - author_id -> optional id of the user who asked, only they can use the buttons
+    """
+
+    def __init__(self, title, items, reroll=None, author_id=None, page_size=PAGE_SIZE, timeout=VIEW_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.title = title
+        self.reroll_items = reroll
+        self.author_id = author_id
+        self.page_size = page_size
+        self.message = None
+        self._set_items(items)
+
+    def _set_items(self, items):
+        self.items = items
+        self.fields = normalize_fields(items, 'title', 'overview', PAGE_VALUE_LIMIT)
+        self.thumbnails = [posters.url(item.poster_path, 'thumbnail') for item in items]
+        self.page = 0
+
+    @property
+    def pages(self):
+        return max(1, -(-len(self.fields) // self.page_size))
+
+    def render(self):
+        start = self.page * self.page_size
+        embed = discord.Embed(title=self.title, description='')
+        for name, value in self.fields[start:start + self.page_size]:
+            embed.add_field(name=name, value=value, inline=False)
+        thumbnail = next((url for url in self.thumbnails[start:start + self.page_size] if url), None)
+        if thumbnail is not None:
+            embed.set_thumbnail(url=thumbnail)
+        embed.set_footer(text=f'Page {self.page + 1}/{self.pages}')
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+        return embed
+
+    async def send(self, channel):
+        with timed_send():
+            self.message = await channel.send(embed=self.render(), view=self)
+        cursors.add(self.message.id, self)
+        return self.message
+
+    async def update(self, items):
+        """
+        Replace the results of the sent message in place, eg:- when fresher ones arrive
+        """
+        self._set_items(items)
+        with timed_send():
+            await self.message.edit(embed=self.render(), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        # A reroll marks the titles seen in the author's history, so nobody else may page or reroll
+        if self.author_id is None or interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message('Only the person who asked can use these buttons', ephemeral=True)
+        return False
+
+    @discord.ui.button(label='Prev', style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label='Next', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(self.pages - 1, self.page + 1)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label='Reroll', style=discord.ButtonStyle.blurple)
+    async def reroll(self, interaction: discord.Interaction, button: discord.ui.Button):
+        items = self.reroll_items() if self.reroll_items is not None else None
+        if not items:
+            # Nothing fresh in memory, reshuffle what we already have
+            items = random.sample(self.items, len(self.items))
+        self._set_items(items)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            cursors.remove(self.message.id)
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+        self.items, self.fields, self.thumbnails = [], [], []
+
+    def close(self):
+        """
+        Stop the view early and strip its buttons, used when the cursor cache evicts it
+        """
+        self.stop()
+        if self.message is not None:
+            task = asyncio.create_task(self.on_timeout())
+            CLOSING_VIEWS.add(task)
+            task.add_done_callback(CLOSING_VIEWS.discard)
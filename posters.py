@@ -0,0 +1,69 @@
+from tmdb_client import tmdb
+
+# Used until /configuration has been loaded, matches what TMDB serves today
+DEFAULT_BASE_URL = 'https://image.tmdb.org/t/p/'
+DEFAULT_SIZES = ('w92', 'w154', 'w185', 'w342', 'w500', 'w780', 'original')
+
+# Width in pixels wanted for each place a poster is shown
+CONTEXT_WIDTHS = {
+    'embed': 500,
+    'thumbnail': 154,
+}
+
+
+def pick_size(sizes, width):
+    """
+    Smallest TMDB width variant at least as wide as wanted, eg:- 300 -> w342
+    Falls back to the widest variant, and to original when there are no width variants.
+    """
+    widths = sorted(int(size[1:]) for size in sizes if size.startswith('w') and size[1:].isdigit())
+    for candidate in widths:
+        if candidate >= width:
+            return f'w{candidate}'
+    return f'w{widths[-1]}' if widths else 'original'
+
+
+class Posters:
+    """
+    Builds poster URLs at a size suited to where they are shown instead of
+    the multi-megabyte originals, from the image base URL and poster sizes
+    TMDB publishes in /configuration.
+    Params
+        - client -> TMDBClient used to load /configuration
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.base_url = DEFAULT_BASE_URL
+        self.sizes = {}
+        self._apply(DEFAULT_SIZES)
+
+    def _apply(self, sizes):
+        self.sizes = {context: pick_size(sizes, width) for context, width in CONTEXT_WIDTHS.items()}
+
+    async def load(self):
+        """
+        Load the image base URL and sizes, keeping the current ones if TMDB can't be reached
+        """
+        data = await self.client.get('/configuration')
+        if data is None:
+            return
+        images = data.get('images', {})
+        self.base_url = images.get('secure_base_url') or self.base_url
+        if images.get('poster_sizes'):
+            self._apply(images['poster_sizes'])
+
+    def url(self, poster_path, context='embed'):
+        """
+        Params
+            - poster_path -> TMDB poster path, eg:- /abc.jpg, may be None
+            - context -> embed or thumbnail
+        Returns
+            - poster URL, or None when the title has no poster
+        """
+        if not poster_path:
+            return None
+        return f"{self.base_url}{self.sizes[context]}/{poster_path.lstrip('/')}"
+
+
+posters = Posters(tmdb)
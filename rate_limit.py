@@ -0,0 +1,69 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+
+# Guild the current command runs for, set by on_message; None for background work
+current_guild = ContextVar('current_guild', default=None)
+
+
+class FairRateLimiter:
+    """
+    Process-wide token bucket for TMDB requests with fair queueing.
+    Waiters are queued per guild and served round-robin, so one noisy server
+    cannot starve the others, and background work gets its own queue.
+    Params
+        - rate -> tokens added per second
+        - burst -> bucket capacity
+    """
+
+    def __init__(self, rate=40, burst=40):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._queues = OrderedDict()
+        self._pump_task = None
+
+    def _take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        """
+        Wait for a request token
+        """
+        if not self._queues and self._take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(current_guild.get(), deque()).append(future)
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+
+    async def _pump(self):
+        while self._queues:
+            if not self._take():
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            # Serve the head of the oldest guild queue, then move that guild to the back
+            guild, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(guild)
+            else:
+                del self._queues[guild]
+            if future.done():
+                # The waiter was cancelled, give the token back
+                self.tokens += 1
+                continue
+            future.set_result(None)
+
+    @property
+    def waiting(self):
+        return sum(len(queue) for queue in self._queues.values())
@@ -0,0 +1,145 @@
+import asyncio
+import math
+import re
+from collections import Counter
+
+from genre_pool import pools
+from genres import PrefixIndex, normalize
+
+STOPWORDS = frozenset(
+    'the and for with his her their they them who when where what which from into this that are was were '
+    'has have had but not its him she one two after about over while will can all out than then there '
+    'been being also more most only other some such very just own our your you'.split()
+)
+MAX_FEATURES = 768
+GENRE_WEIGHT = 1.0
+TEXT_WEIGHT = 1.0
+NUMERIC_WEIGHT = 0.3
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9']+", text.lower()) if len(t) > 2 and t not in STOPWORDS]
+
+
+def _unit_rows(matrix):
+    import numpy as np
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class Recommender:
+    """
+    Content-based recommender over the titles in the genre pools.
+    Every title becomes a row of genre one-hot, TF-IDF of its overview and
+    popularity/vote features, each block unit-normalized and weighted, so a
+    "more like this" query is one matrix-vector product plus a top-k partition.
+    Params
+        - pools -> GenrePools whose title table is indexed
+        - kind -> movie or tv
+    """
+
+    def __init__(self, pools, kind='movie'):
+        self.pools = pools
+        self.kind = kind
+        # numpy is imported by the first build, off the startup path
+        self.ids = ()
+        self.matrix = None
+        self.records = {}
+        self.titles = {}
+        self.completions = PrefixIndex(())
+
+    async def rebuild(self):
+        """
+        Snapshot the pool's title table on the loop and build the index in a worker thread
+        Returns
+            - Number of titles indexed
+        """
+        records = dict(self.pools.titles[self.kind])
+        index = await asyncio.to_thread(self.build, records)
+        if index is None:
+            return 0
+        # Swapped in on the loop so a query never sees half of an old index
+        self.ids, self.matrix, self.titles, self.completions = index
+        self.records = records
+        return len(self.ids)
+
+    def build(self, records):
+        """
+        Build the feature matrix from a snapshot of the pool's title table
+        Returns
+            - (ids, matrix, titles, completions), or None when there is nothing to index
+        """
+        ids = list(records)
+        if not ids:
+            return None
+        import numpy as np
+
+        docs = [Counter(tokenize(records[movie_id].overview)) for movie_id in ids]
+        df = Counter(term for doc in docs for term in doc)
+        max_df = max(2, len(ids) // 2)
+        vocab = [term for term, count in df.most_common() if 2 <= count <= max_df][:MAX_FEATURES]
+        columns = {term: i for i, term in enumerate(vocab)}
+        idf = np.array([math.log((1 + len(ids)) / (1 + df[term])) + 1 for term in vocab], dtype=np.float32)
+
+        genre_columns = {g: i for i, g in enumerate(sorted({g for movie_id in ids for g in records[movie_id].genre_ids}))}
+        genres = np.zeros((len(ids), len(genre_columns)), dtype=np.float32)
+        text = np.zeros((len(ids), len(vocab)), dtype=np.float32)
+        numeric = np.zeros((len(ids), 2), dtype=np.float32)
+        for row, (movie_id, doc) in enumerate(zip(ids, docs)):
+            record = records[movie_id]
+            for g in record.genre_ids:
+                genres[row, genre_columns[g]] = 1
+            for term, count in doc.items():
+                column = columns.get(term)
+                if column is not None:
+                    text[row, column] = count
+            numeric[row] = (math.log1p(record.popularity), record.vote_average / 10)
+        text *= idf
+        numeric[:, 0] /= max(float(numeric[:, 0].max()), 1e-6)
+
+        matrix = np.hstack([
+            GENRE_WEIGHT * _unit_rows(genres),
+            TEXT_WEIGHT * _unit_rows(text),
+            NUMERIC_WEIGHT * _unit_rows(numeric),
+        ])
+        titles = {normalize(records[movie_id].title): row for row, movie_id in enumerate(ids)}
+        completions = PrefixIndex(records[movie_id].title for movie_id in ids)
+        return np.array(ids, dtype=np.int32), _unit_rows(matrix).astype(np.float32), titles, completions
+
+    def find(self, title):
+        """
+        Find the row of a title, by exact normalized title and then by prefix
+        Returns
+            - row index, or None
+        """
+        key = normalize(title)
+        row = self.titles.get(key)
+        if row is not None or not key:
+            return row
+        matches = [(len(name), row) for name, row in self.titles.items() if name.startswith(key)]
+        return min(matches)[1] if matches else None
+
+    def similar(self, title, k=10):
+        """
+        Top-k titles most similar to a title in the index
+        Returns
+            - (matched title, list of Title), or None if the title isn't indexed
+        """
+        row = self.find(title)
+        if row is None:
+            return None
+        import numpy as np
+        scores = self.matrix @ self.matrix[row]
+        scores[row] = -np.inf
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return None
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        records = self.records
+        matched = records[int(self.ids[row])].title
+        return matched, [records[int(self.ids[i])] for i in top]
+
+
+recommender = Recommender(pools)
@@ -0,0 +1,76 @@
+import json
+import sys
+from dataclasses import dataclass
+
+# Endpoints whose results are lists of titles, decoded straight into Title records
+LISTING_PREFIXES = ('/discover/', '/movie/popular', '/tv/popular', '/search/', '/trending/')
+
+# Equal genre id tuples share one object, most titles fall into a few hundred combinations
+_genre_ids = {}
+
+
+@dataclass(slots=True)
+class Title:
+    """
+    Slim catalog record of a movie or TV show, keeping only what the bot uses.
+    TV show names are kept in title too.
+    """
+    id: int
+    title: str
+    overview: str
+    poster_path: object
+    genre_ids: tuple
+    popularity: float
+    vote_average: float
+    language: str
+
+
+def intern_genre_ids(genre_ids):
+    key = tuple(genre_ids)
+    return _genre_ids.setdefault(key, key)
+
+
+def _to_title(obj):
+    """
+    json object_hook turning TMDB list results into Title records, other objects pass through
+    """
+    if 'overview' not in obj or 'id' not in obj:
+        return obj
+    name = obj.get('title') or obj.get('name')
+    if name is None:
+        return obj
+    return Title(
+        obj['id'],
+        name,
+        obj['overview'] or '',
+        obj.get('poster_path'),
+        intern_genre_ids(obj.get('genre_ids') or ()),
+        obj.get('popularity') or 0.0,
+        obj.get('vote_average') or 0.0,
+        sys.intern(obj.get('original_language') or ''),
+    )
+
+
+def from_details(details):
+    """
+    Build a Title from a /movie/{id} or /tv/{id} details response
+    """
+    return Title(
+        details['id'],
+        details.get('title') or details.get('name') or 'Unknown',
+        details.get('overview') or '',
+        details.get('poster_path'),
+        intern_genre_ids(g['id'] for g in details.get('genres', ())),
+        details.get('popularity') or 0.0,
+        details.get('vote_average') or 0.0,
+        sys.intern(details.get('original_language') or ''),
+    )
+
+
+def loads(path, body):
+    """
+    Decode a TMDB response body, with the results of list endpoints as Title records
+    """
+    if path.startswith(LISTING_PREFIXES):
+        return json.loads(body, object_hook=_to_title)
+    return json.loads(body)
@@ -0,0 +1,119 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header, given either as seconds or as an HTTP date
+    Returns
+        - seconds to wait, or None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a TMDB request.
+    Delays use full jitter exponential backoff so retries from many commands
+    spread out instead of arriving together, a Retry-After from the server
+    takes precedence, and no retry is made that would end past the deadline.
+    Params
+        - attempts -> max attempts per request
+        - base -> backoff ceiling of the first retry in seconds, doubled each retry
+        - cap -> largest backoff ceiling
+        - deadline -> seconds a request may take across all its attempts
+    """
+
+    def __init__(self, attempts=3, base=0.5, cap=8, deadline=10):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.deadline = deadline
+
+    @staticmethod
+    def retryable(status):
+        """
+        Rate limits, server errors and network failures (status None) are worth another try
+        """
+        return status is None or status == 429 or status >= 500
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing.
+    After failure_threshold consecutive failures the breaker opens and requests
+    fail at once. Every reset_timeout a single probe request is let through:
+    success closes the breaker, failure keeps it open.
+    Params
+        - failure_threshold -> consecutive failures that open the breaker
+        - reset_timeout -> seconds to stay open before probing
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        # Probe once per reset_timeout, which also covers a probe that never reported back
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self.opened_at = now
+            return True
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f'Circuit opened after {self.failures} failures')
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class BreakerBoard:
+    """
+    One circuit breaker per endpoint label, created on first use
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+
+    def get(self, endpoint):
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def open_endpoints(self):
+        return [endpoint for endpoint, breaker in self.breakers.items() if breaker.state != CLOSED]
@@ -0,0 +1,117 @@
+class Argument:
+    """
+    A typed positional command argument
+    Params
+        - name -> keyword the handler receives it as
+        - type -> converter applied to the token, eg:- str, int
+        - rest -> consume every remaining token, joined by spaces
+        - default -> value when the token is missing, required if not given
+    """
+
+    REQUIRED = object()
+
+    def __init__(self, name, type=str, rest=False, default=REQUIRED):
+        self.name = name
+        self.type = type
+        self.rest = rest
+        self.default = default
+
+
+class Command:
+    def __init__(self, path, handler, args, usage):
+        self.path = path
+        self.handler = handler
+        self.args = args
+        self.usage = usage
+
+    def parse_args(self, tokens):
+        """
+        Convert the tokens after the command path into handler kwargs
+        Returns
+            - dict of kwargs, or None if the tokens don't fit the arguments
+        """
+        kwargs = {}
+        for i, arg in enumerate(self.args):
+            if arg.rest:
+                token = ' '.join(tokens[i:]) or None
+            else:
+                token = tokens[i] if i < len(tokens) else None
+            if token is None:
+                if arg.default is Argument.REQUIRED:
+                    return None
+                kwargs[arg.name] = arg.default
+                continue
+            try:
+                kwargs[arg.name] = arg.type(token)
+            except ValueError:
+                return None
+        return kwargs
+
+
+class CommandRouter:
+    """
+    Dispatch table for prefix commands, built once at startup.
+    Commands live in a tree of dicts keyed by word, so a message is tokenized
+    once and routed with a few hash lookups, and anything that doesn't start
+    with the prefix is rejected before it is split at all.
+    Params
+        - prefix -> eg:- !
+    """
+
+    def __init__(self, prefix='!'):
+        self.prefix = prefix
+        self.routes = {}
+
+    def command(self, path, args=(), usage=None):
+        """
+        Decorator registering a handler for a command path, eg:- 'recommend list'
+        """
+        words = tuple(path.split())
+
+        def register(handler):
+            node = self.routes
+            for word in words:
+                node = node.setdefault(word, {})
+            node[None] = Command(words, handler, list(args), usage or self.prefix + path)
+            return handler
+        return register
+
+    def get(self, path):
+        """
+        Look up a registered command by its path, eg:- 'recommend list'
+        """
+        node = self.routes
+        for word in path.split():
+            node = node.get(word)
+            if node is None:
+                return None
+        return node.get(None)
+
+    def resolve(self, content):
+        """
+        Route message content to a command
+        Returns
+            - (command, kwargs) -> kwargs is None when the arguments don't parse
+            - None when the content isn't a known command
+        """
+        if not content.startswith(self.prefix):
+            return None
+        tokens = content[len(self.prefix):].split()
+        node = self.routes
+        command, depth = None, 0
+        for i, token in enumerate(tokens):
+            node = node.get(token.lower())
+            if node is None:
+                break
+            if None in node:
+                command, depth = node[None], i + 1
+        if command is None:
+            return None
+        return command, command.parse_args(tokens[depth:])
+
+    async def dispatch(self, message, route):
+        command, kwargs = route
+        if kwargs is None:
+            await message.channel.send(f'Usage: {command.usage}')
+            return
+        await command.handler(message, **kwargs)
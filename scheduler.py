@@ -0,0 +1,175 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+
+from genre_pool import pools
+from posters import posters
+from recommender import recommender
+from tmdb_client import tmdb
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+
+GENRES_INTERVAL = 24 * HOUR
+CONFIGURATION_INTERVAL = 24 * HOUR
+POPULAR_INTERVAL = 10 * MINUTE
+POOL_INTERVAL = 6 * HOUR
+CHANGES_INTERVAL = HOUR
+RECOMMENDER_INTERVAL = 6 * HOUR
+# Details fetched per changes run, keeps the job inside the rate budget
+MAX_CHANGED_DETAILS = 200
+
+
+class RefreshScheduler:
+    """
+    Runs refresh jobs on their own intervals in the background.
+    Jobs start staggered and every sleep is jittered, so refreshes don't line
+    up into bursts, and a failing job is logged and retried on its next run.
+    Params
+        - jitter -> fraction of the interval each sleep is randomly moved by
+    """
+
+    def __init__(self, jitter=0.1):
+        self.jitter = jitter
+        self.jobs = []
+        self.last_run = {}
+        self._tasks = []
+
+    def add(self, name, interval, job, initial_delay=0):
+        """
+        Register a job
+        Params
+            - job -> coroutine function taking no arguments
+            - initial_delay -> seconds before the first run
+        """
+        self.jobs.append((name, interval, job, initial_delay))
+        if self._tasks:
+            self._tasks.append(asyncio.create_task(self._run(name, interval, job, initial_delay)))
+
+    def start(self):
+        for name, interval, job, initial_delay in self.jobs:
+            self._tasks.append(asyncio.create_task(self._run(name, interval, job, initial_delay)))
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _run(self, name, interval, job, initial_delay):
+        await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                await job()
+                self.last_run[name] = time.time()
+            except Exception as e:
+                print(f'Refresh job {name} failed:', repr(e))
+            await asyncio.sleep(interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+class CatalogRefresher:
+    """
+    The catalog refresh jobs: genre lists, image configuration, popular movies
+    and TV, every genre pool and incremental metadata updates from the TMDB
+    changes endpoints.
+    Only the leader refetches from TMDB, other processes rebuild from the
+    responses their cache pulls from the shared store.
+    Params
+        - is_leader -> callable telling whether this process refreshes from TMDB
+    """
+
+    def __init__(self, is_leader):
+        self.is_leader = is_leader
+        self.changes_since = {}
+        self.applied = {}
+        self.backlog = {}
+
+    async def refresh_genres(self):
+        if self.is_leader():
+            await tmdb.refresh('/genre/movie/list')
+            await tmdb.refresh('/genre/tv/list')
+
+    async def refresh_configuration(self):
+        if self.is_leader():
+            await tmdb.refresh('/configuration')
+        await posters.load()
+
+    async def refresh_popular(self):
+        if self.is_leader():
+            await tmdb.popular('movie', fresh=True)
+            await tmdb.popular('tv', fresh=True)
+
+    async def refresh_pool(self, kind, genre_id):
+        await pools.build(kind, genre_id, fresh=self.is_leader())
+
+    async def refresh_recommender(self):
+        indexed = await recommender.rebuild()
+        print(f'Recommender indexed {indexed} movies')
+
+    async def apply_changes(self, kind):
+        """
+        Update pooled titles TMDB reports as changed since the previous run.
+        The changes endpoints only take whole UTC dates, so every run of a day
+        lists the day's changes again. Titles already updated on or after the
+        start date are skipped, and changed titles past MAX_CHANGED_DETAILS
+        are carried over to the next run instead of dropped.
+        """
+        if not self.is_leader():
+            return
+        since = self.changes_since.get(kind, time.time() - CHANGES_INTERVAL)
+        started = time.time()
+        start_date = datetime.fromtimestamp(since, timezone.utc).strftime('%Y-%m-%d')
+        end_date = datetime.fromtimestamp(started, timezone.utc).strftime('%Y-%m-%d')
+        titles = pools.titles[kind]
+        # title id -> UTC date it was updated on
+        applied = {item_id: date for item_id, date in self.applied.get(kind, {}).items() if date >= start_date}
+        # Ordered set, titles left over from earlier runs come first
+        backlog = self.backlog.setdefault(kind, {})
+        page, total_pages = 1, 1
+        while page <= total_pages:
+            data = await tmdb.get(f'/{kind}/changes', {'start_date': start_date, 'end_date': end_date, 'page': page})
+            if data is None:
+                return
+            for r in data.get('results', []):
+                if r['id'] in titles and r['id'] not in applied:
+                    backlog[r['id']] = None
+            total_pages = data.get('total_pages', 1)
+            page += 1
+
+        updated = 0
+        for item_id in list(backlog)[:MAX_CHANGED_DETAILS]:
+            del backlog[item_id]
+            # Titles a pool rebuild has dropped since they were listed aren't worth a request
+            if item_id not in titles:
+                continue
+            details = await tmdb.get(f'/{kind}/{item_id}')
+            if details is None:
+                backlog[item_id] = None
+                continue
+            applied[item_id] = end_date
+            if pools.update(kind, details):
+                updated += 1
+        self.applied[kind] = applied
+        self.changes_since[kind] = started
+        if updated or backlog:
+            print(f'Updated {updated} changed {kind} titles, {len(backlog)} left for the next run')
+
+    def schedule(self, scheduler):
+        """
+        Register every refresh job. Pool jobs are spread evenly over their interval.
+        """
+        scheduler.add('genres', GENRES_INTERVAL, self.refresh_genres, initial_delay=GENRES_INTERVAL)
+        scheduler.add('configuration', CONFIGURATION_INTERVAL, self.refresh_configuration,
+                      initial_delay=CONFIGURATION_INTERVAL)
+        scheduler.add('popular', POPULAR_INTERVAL, self.refresh_popular, initial_delay=POPULAR_INTERVAL)
+        scheduler.add('recommender', RECOMMENDER_INTERVAL, self.refresh_recommender,
+                      initial_delay=RECOMMENDER_INTERVAL)
+        for i, kind in enumerate(('movie', 'tv')):
+            scheduler.add(f'changes:{kind}', CHANGES_INTERVAL, lambda kind=kind: self.apply_changes(kind),
+                          initial_delay=CHANGES_INTERVAL * (i + 1) / 2)
+
+        keys = list(pools.pools)
+        for i, (kind, genre_id) in enumerate(keys):
+            scheduler.add(f'pool:{kind}:{genre_id}', POOL_INTERVAL,
+                          lambda kind=kind, genre_id=genre_id: self.refresh_pool(kind, genre_id),
+                          initial_delay=POOL_INTERVAL * (i + 1) / len(keys))
@@ -0,0 +1,150 @@
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+KINDS = {'movie': 0, 'tv': 1}
+TITLE_WEIGHT = 3
+K1 = 1.2
+B = 0.75
+# Vocabulary terms a trailing partial word may expand to
+MAX_EXPANSIONS = 64
+# Words a match_all search doesn't require, eg:- the in 'the godfather'
+STOPWORDS = frozenset('a an and at by for from in into of on or the to with'.split())
+
+
+def tokenize(text):
+    """
+    Lowercase, accent-free alphanumeric words, eg:- 'Amélie (2001)' -> ['amelie', '2001']
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    return re.findall(r'[a-z0-9]+', text.encode('ascii', 'ignore').decode())
+
+
+class SearchIndex:
+    """
+    Inverted index over the titles and overviews of catalog movies and TV shows,
+    ranked with BM25. Title words count TITLE_WEIGHT times an overview word.
+    Titles are added one by one as pages are ingested, re-adding one replaces
+    it, and the last word of a query also matches as a prefix so partial
+    input (autocomplete) works.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.docs = {}
+        self.total_length = 0
+        self._vocab = []
+        self._vocab_dirty = False
+
+    @staticmethod
+    def _doc(kind, title_id):
+        return title_id * 2 + KINDS[kind]
+
+    def add(self, kind, record):
+        """
+        Index a Title record, replacing an older version of it
+        """
+        doc = self._doc(kind, record.id)
+        if doc in self.docs:
+            self.remove(kind, record.id)
+        counts = {}
+        for term in tokenize(record.title):
+            counts[term] = counts.get(term, 0) + TITLE_WEIGHT
+        for term in tokenize(record.overview):
+            counts[term] = counts.get(term, 0) + 1
+        length = sum(counts.values())
+        for term, count in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._vocab_dirty = True
+            postings[doc] = count
+        self.docs[doc] = (record, length, tuple(counts))
+        self.total_length += length
+
+    def remove(self, kind, title_id):
+        doc = self._doc(kind, title_id)
+        entry = self.docs.pop(doc, None)
+        if entry is None:
+            return
+        _, length, terms = entry
+        self.total_length -= length
+        for term in terms:
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                del self.postings[term]
+                self._vocab_dirty = True
+
+    def _expand(self, prefix):
+        if self._vocab_dirty:
+            self._vocab = sorted(self.postings)
+            self._vocab_dirty = False
+        start = bisect_left(self._vocab, prefix)
+        terms = []
+        for term in self._vocab[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, text, kind=None, k=10, match_all=False):
+        """
+        Rank indexed titles against a query
+        Params
+            - text -> query, its last word also matches as a prefix unless followed by a space
+            - kind -> optional movie or tv to restrict results to
+            - match_all -> only return titles matching every query word but stopwords, otherwise any word is enough
+        Returns
+            - list of Title, best match first
+        """
+        terms = tokenize(text)
+        if not terms or not self.docs:
+            return []
+        groups = [[term] for term in terms]
+        if not text[-1].isspace():
+            groups[-1] = self._expand(terms[-1]) or groups[-1]
+        required = None
+        if match_all:
+            required = [term not in STOPWORDS for term in terms]
+            if not any(required):
+                required = [True] * len(terms)
+
+        n = len(self.docs)
+        average = self.total_length / n
+        scores = {}
+        matched = {}
+        for i, group in enumerate(groups):
+            # A partial word scores as its best completion in each title
+            best = {}
+            for term in group:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, count in postings.items():
+                    length = self.docs[doc][1]
+                    score = idf * count * (K1 + 1) / (count + K1 * (1 - B + B * length / average))
+                    if score > best.get(doc, 0):
+                        best[doc] = score
+            for doc, score in best.items():
+                scores[doc] = scores.get(doc, 0) + score
+                if required is not None and required[i]:
+                    matched[doc] = matched.get(doc, 0) + 1
+
+        if required is not None:
+            needed = sum(required)
+            scores = {doc: score for doc, score in scores.items() if matched.get(doc, 0) == needed}
+
+        if kind is not None:
+            scores = {doc: score for doc, score in scores.items() if doc % 2 == KINDS[kind]}
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.docs[doc][0] for doc, _ in top]
+
+    def __len__(self):
+        return len(self.docs)
+
+
+search_index = SearchIndex()
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+import discord
+
+from config import config
+
+LEASE_NAME = 'refresher'
+LEASE_TTL = 60
+
+
+def make_client(intents):
+    """
+    Build the Discord client for this process.
+    With SHARD_COUNT set it is an AutoShardedClient running the shards listed
+    in SHARD_IDS (all of them when unset), otherwise a plain single-shard Client.
+    """
+    if config.shard_count is None:
+        return discord.Client(intents=intents)
+    return discord.AutoShardedClient(
+        intents=intents,
+        shard_count=config.shard_count,
+        shard_ids=config.shard_ids,
+    )
+
+
+class Leadership:
+    """
+    Elects the one process that refreshes the shared catalog store.
+    The leader holds a lease row in the store and renews it, followers keep
+    trying so one of them takes over when the leader goes away. Without a
+    store every process leads itself.
+    Params
+        - store -> CatalogStore shared by the shard processes, or None
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self.is_leader = store is None
+
+    async def campaign(self):
+        """
+        Try to take or renew the lease
+        Returns
+            - True if this process leads
+        """
+        if self.store is not None:
+            self.is_leader = await asyncio.to_thread(self.store.acquire_lease, LEASE_NAME, self.owner, LEASE_TTL)
+        return self.is_leader
+
+    async def keep_campaigning(self, on_change):
+        """
+        Renew or contest the lease every third of its TTL, calling on_change(is_leader) when the role flips
+        """
+        if self.store is None:
+            return
+        while True:
+            await asyncio.sleep(LEASE_TTL / 3)
+            was_leader = self.is_leader
+            if await self.campaign() != was_leader:
+                on_change(self.is_leader)
+
+
+def launch(workers, shard_count, script='movie_bot.py'):
+    """
+    Run the bot as several worker processes, each owning a contiguous range of shards
+    Returns
+        - exit status, the highest of the workers'
+    """
+    if workers > 1 and config.catalog_path is None:
+        # Without a shared store every worker leads and refreshes on its own, N times the TMDB calls
+        print('CATALOG_PATH must be set so the workers can share one catalog')
+        return 1
+    processes = []
+    per_worker = -(-shard_count // workers)
+    for worker in range(workers):
+        first = worker * per_worker
+        last = min(shard_count, first + per_worker) - 1
+        if first > last:
+            break
+        env = dict(os.environ, SHARD_COUNT=str(shard_count), SHARD_IDS=f'{first}-{last}')
+        print(f'Starting worker {worker} with shards {first}-{last}')
+        processes.append(subprocess.Popen([sys.executable, script], env=env))
+
+    def stop(*_):
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    return max(process.wait() for process in processes)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the bot across several sharded worker processes')
+    parser.add_argument('--workers', type=int, required=True)
+    parser.add_argument('--shard-count', type=int, required=True)
+    args = parser.parse_args()
+    sys.exit(launch(args.workers, args.shard_count))
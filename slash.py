@@ -0,0 +1,157 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import discord
+from discord import app_commands
+
+from admission import CHANNEL_BUSY
+from genres import genre_index
+from recommender import recommender
+from search_index import search_index
+
+# Discord drops an interaction not answered within 3 seconds, slower commands defer first
+DEFER_AFTER = 1.5
+MAX_CHOICES = 25
+
+
+class InteractionChannel:
+    """
+    Stands in for a message's channel so prefix command handlers can answer
+    a slash command: the first send is the interaction response (or fills in
+    a deferred one) and later sends are followups.
+    """
+
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.id = interaction.channel_id
+        self.answered = False
+        self._lock = asyncio.Lock()
+
+    async def defer(self):
+        async with self._lock:
+            if not self.interaction.response.is_done():
+                await self.interaction.response.defer(thinking=True)
+
+    @asynccontextmanager
+    async def typing(self):
+        """
+        A slash command's typing indicator is deferring, Discord then shows the bot thinking
+        """
+        await self.defer()
+        yield
+
+    async def send(self, content=None, **kwargs):
+        async with self._lock:
+            self.answered = True
+            if not self.interaction.response.is_done():
+                callback = await self.interaction.response.send_message(content, **kwargs)
+                return callback.resource
+            return await self.interaction.followup.send(content, wait=True, **kwargs)
+
+
+class InteractionMessage:
+    """
+    The parts of discord.Message the command handlers use, built from an interaction
+    """
+
+    def __init__(self, interaction, content):
+        self.id = interaction.id
+        self.content = content
+        self.author = interaction.user
+        self.guild = interaction.guild
+        self.channel = InteractionChannel(interaction)
+
+
+def genre_choices(kind, current, extra=()):
+    """
+    Genre autocomplete from the genre table already in memory, never fetching
+    """
+    table = genre_index.tables.get(kind)
+    names = [name for name in extra if name.startswith(current.lower())]
+    if table is not None:
+        names += table.completions.complete(current, MAX_CHOICES) if current else sorted(table.names.values())
+    return [app_commands.Choice(name=name, value=name) for name in names[:MAX_CHOICES]]
+
+
+def title_choices(current):
+    return [app_commands.Choice(name=title[:100], value=title[:100])
+            for title in recommender.completions.complete(current, MAX_CHOICES)]
+
+
+def search_choices(current):
+    titles = dict.fromkeys(record.title[:100] for record in search_index.search(current, k=MAX_CHOICES))
+    return [app_commands.Choice(name=title, value=title) for title in titles]
+
+
+def register_commands(tree, router, run):
+    """
+    Add the /recommend and /search slash commands to a command tree. Each one
+    runs the handler of the matching prefix command through run(message, route, started).
+    """
+    group = app_commands.Group(name='recommend', description='Movie and TV show recommendations')
+
+    async def invoke(interaction, path, **kwargs):
+        started = time.perf_counter()
+        command = router.get(path)
+        message = InteractionMessage(interaction, ' '.join([router.prefix + path, *kwargs.values()]).lower())
+        task = asyncio.create_task(run(message, (command, kwargs), started))
+        done, _ = await asyncio.wait({task}, timeout=DEFER_AFTER)
+        if not done:
+            # Still fetching, acknowledge now and answer with a followup
+            await message.channel.defer()
+        rejected = await task
+        if rejected == CHANNEL_BUSY:
+            await message.channel.send('This channel has several commands running, please try again in a moment',
+                                       ephemeral=True)
+        elif not message.channel.answered:
+            await message.channel.send('Please wait a moment before sending another command', ephemeral=True)
+
+    @group.command(name='movie', description='Recommend a movie of a genre, or a random one')
+    @app_commands.describe(genre='Genre, eg:- action, or random')
+    async def movie(interaction: discord.Interaction, genre: str):
+        await invoke(interaction, 'recommend', genre=genre)
+
+    @movie.autocomplete('genre')
+    async def movie_genre(interaction: discord.Interaction, current: str):
+        return genre_choices('movie', current, extra=('random',))
+
+    @group.command(name='list', description='Recommend a list of movies of a genre')
+    @app_commands.describe(genre='Genre, eg:- comedy')
+    async def movie_list(interaction: discord.Interaction, genre: str):
+        await invoke(interaction, 'recommend list', genre=genre)
+
+    @movie_list.autocomplete('genre')
+    async def movie_list_genre(interaction: discord.Interaction, current: str):
+        return genre_choices('movie', current)
+
+    @group.command(name='tv', description='Recommend a list of TV shows of a genre')
+    @app_commands.describe(genre='Genre, eg:- drama')
+    async def tv(interaction: discord.Interaction, genre: str):
+        await invoke(interaction, 'recommend tv', genre=genre)
+
+    @tv.autocomplete('genre')
+    async def tv_genre(interaction: discord.Interaction, current: str):
+        return genre_choices('tv', current)
+
+    @group.command(name='like', description='Recommend movies similar to a movie')
+    @app_commands.describe(title='Movie title')
+    async def like(interaction: discord.Interaction, title: str):
+        await invoke(interaction, 'recommend like', title=title)
+
+    @like.autocomplete('title')
+    async def like_title(interaction: discord.Interaction, current: str):
+        return title_choices(current)
+
+    @app_commands.command(name='search', description='Find movies and TV shows by title or plot')
+    @app_commands.describe(text='Title or words from the plot')
+    async def search(interaction: discord.Interaction, text: str):
+        await invoke(interaction, 'search', text=text)
+
+    @search.autocomplete('text')
+    async def search_text(interaction: discord.Interaction, current: str):
+        return search_choices(current)
+
+    tree.add_command(group)
+    tree.add_command(search)
+    return group
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The bot's modules sit at the top of the repo rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Scratch scripts that log in to Discord or call the live TMDB API when imported
+collect_ignore = ['button_test.py', 'genre_test.py', 'test.py', 'test2.py']
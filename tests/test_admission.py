@@ -0,0 +1,49 @@
+from admission import CHANNEL_BUSY, USER_BUSY, AdmissionControl
+
+
+def test_admits_and_releases():
+    admission = AdmissionControl()
+    ticket = admission.admit(1, 10, '!recommend action')
+    assert ticket is not None
+    assert admission.last_rejection is None
+    ticket.release()
+    assert not admission._user_inflight
+    assert not admission._channel_inflight
+
+
+def test_same_user_repeating_a_command_is_dropped():
+    admission = AdmissionControl()
+    assert admission.admit(1, 10, '!recommend action') is not None
+    assert admission.admit(1, 10, '!recommend action') is None
+    assert admission.last_rejection == USER_BUSY
+    assert admission.rejected == 1
+
+
+def test_other_users_may_send_the_same_command():
+    admission = AdmissionControl()
+    assert admission.admit(1, 10, '!recommend action') is not None
+    assert admission.admit(2, 10, '!recommend action') is not None
+
+
+def test_user_cooldown():
+    admission = AdmissionControl(user_burst=2, max_user_inflight=10)
+    assert admission.admit(1, 10, 'a') is not None
+    assert admission.admit(1, 10, 'b') is not None
+    assert admission.admit(1, 10, 'c') is None
+    assert admission.last_rejection == USER_BUSY
+
+
+def test_user_inflight_cap():
+    admission = AdmissionControl(max_user_inflight=1)
+    with admission.admit(1, 10, 'a'):
+        assert admission.admit(1, 11, 'b') is None
+        assert admission.last_rejection == USER_BUSY
+    assert admission.admit(1, 11, 'b') is not None
+
+
+def test_channel_inflight_cap_names_the_channel():
+    admission = AdmissionControl(max_channel_inflight=1)
+    assert admission.admit(1, 10, 'a') is not None
+    assert admission.admit(2, 10, 'b') is None
+    assert admission.last_rejection == CHANNEL_BUSY
+    assert admission.admit(2, 11, 'b') is not None
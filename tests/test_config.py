@@ -0,0 +1,57 @@
+import pytest
+
+from config import DEFAULT_TMDB_BASE_URL, Config, ConfigError
+
+REQUIRED = {'DISCORD_TOKEN': 'token', 'TMDB_API_KEY': 'key'}
+
+
+def test_defaults():
+    config = Config({})
+    assert config.tmdb_base_url == DEFAULT_TMDB_BASE_URL
+    assert config.pool_pages == 25
+    assert config.command_deadline == 2.5
+    assert config.metrics_port is None
+    assert config.prefix_commands
+    assert config.shard_count is None and config.shard_ids is None
+    assert config.problems == []
+
+
+def test_numbers_are_parsed():
+    config = Config({'POOL_PAGES': '10', 'COMMAND_DEADLINE': '1.5', 'METRICS_PORT': '9100', 'PREFIX_COMMANDS': '0'})
+    assert (config.pool_pages, config.command_deadline, config.metrics_port) == (10, 1.5, 9100)
+    assert not config.prefix_commands
+
+
+@pytest.mark.parametrize('name, value', [('POOL_PAGES', 'ten'), ('POOL_PAGES', '0'), ('POOL_PAGES', '2.5'),
+                                         ('COMMAND_DEADLINE', '-1'), ('SHARD_COUNT', 'x')])
+def test_malformed_numbers_are_reported(name, value):
+    config = Config({name: value})
+    assert len(config.problems) == 1
+    assert name in config.problems[0]
+
+
+def test_shard_ids():
+    config = Config({'SHARD_COUNT': '16', 'SHARD_IDS': '0-3,8'})
+    assert config.shard_count == 16
+    assert config.shard_ids == [0, 1, 2, 3, 8]
+
+
+@pytest.mark.parametrize('value', ['0-16', 'a-b', '3-1', '1,,2'])
+def test_malformed_shard_ids_are_reported(value):
+    config = Config({'SHARD_COUNT': '16', 'SHARD_IDS': value})
+    assert config.shard_ids is None
+    assert 'SHARD_IDS' in config.problems[0]
+
+
+def test_shard_ids_need_a_shard_count():
+    assert Config({'SHARD_IDS': '1'}).problems == ['SHARD_IDS needs SHARD_COUNT to be set']
+    # The malformed count is the one problem reported
+    assert len(Config({'SHARD_COUNT': 'x', 'SHARD_IDS': '1'}).problems) == 1
+
+
+def test_validate_lists_every_problem():
+    with pytest.raises(ConfigError) as error:
+        Config({'POOL_PAGES': 'ten'}).validate()
+    message = str(error.value)
+    assert 'DISCORD_TOKEN' in message and 'TMDB_API_KEY' in message and 'POOL_PAGES' in message
+    Config(REQUIRED).validate()
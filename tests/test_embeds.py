@@ -0,0 +1,72 @@
+import asyncio
+
+from embeds import (CHARS_PER_MESSAGE, EMPTY_VALUE, FIELDS_PER_EMBED, FIELD_NAME_LIMIT, normalize_fields,
+                    pack_embeds, send_packed, truncate)
+from records import Title
+
+
+def test_truncate_marks_cut_text():
+    assert truncate('abcdef', 10) == 'abcdef'
+    assert truncate('abcdefghijk', 8) == 'abcde...'
+
+
+def test_normalize_fields_numbers_and_truncates():
+    items = [Title(1, 'x' * 300, '', None, (), 0.0, 0.0, 'en'),
+             Title(2, 'Heat', 'Cops and robbers', None, (), 0.0, 0.0, 'en')]
+    fields = normalize_fields(items, 'title', 'overview', value_limit=10)
+    assert len(fields[0][0]) == FIELD_NAME_LIMIT
+    assert fields[0][1] == truncate(EMPTY_VALUE, 10)
+    assert fields[1] == ('2. Heat', 'Cops an...')
+
+
+def test_small_results_fit_one_embed():
+    messages = pack_embeds('Title', [(f'{i}. name', 'value') for i in range(5)])
+    assert len(messages) == 1
+    assert len(messages[0]) == 1
+    assert len(messages[0][0].fields) == 5
+
+
+def test_fields_past_the_embed_limit_go_to_a_second_embed():
+    messages = pack_embeds('Title', [(f'{i}', 'v') for i in range(FIELDS_PER_EMBED + 1)])
+    assert len(messages) == 1
+    assert [len(embed.fields) for embed in messages[0]] == [FIELDS_PER_EMBED, 1]
+
+
+def test_messages_stay_under_the_character_limit():
+    fields = [(f'{i}', 'v' * 1000) for i in range(20)]
+    messages = pack_embeds('Title', fields)
+    assert len(messages) > 1
+    for embeds in messages:
+        assert sum(len(embed) for embed in embeds) <= CHARS_PER_MESSAGE
+        assert embeds[0].title == 'Title'
+    assert sum(len(embed.fields) for embeds in messages for embed in embeds) == 20
+
+
+class Message:
+    def __init__(self, embeds):
+        self.embeds = embeds
+
+    async def edit(self, embeds):
+        self.embeds = embeds
+
+
+class Channel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, embeds):
+        self.sent.append(Message(embeds))
+        return self.sent[-1]
+
+
+def test_send_packed_edits_earlier_messages_in_place():
+    async def run():
+        channel = Channel()
+        sent = await send_packed(channel, 'Title', [('1', 'a')])
+        sent = await send_packed(channel, 'Title', [('1', 'a'), ('2', 'b')], sent)
+        return channel, sent
+
+    channel, sent = asyncio.run(run())
+    assert len(channel.sent) == 1
+    assert sent == channel.sent
+    assert len(sent[0].embeds[0].fields) == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from genres import GenreTable, PrefixIndex, edit_distance
+
+MOVIE_GENRES = [{'id': 28, 'name': 'Action'}, {'id': 35, 'name': 'Comedy'}, {'id': 18, 'name': 'Drama'},
+                {'id': 878, 'name': 'Science Fiction'}, {'id': 27, 'name': 'Horror'}, {'id': 10752, 'name': 'War'}]
+TV_GENRES = [{'id': 10765, 'name': 'Sci-Fi & Fantasy'}, {'id': 10768, 'name': 'War & Politics'}]
+
+
+@pytest.mark.parametrize('name, genre_id', [('Action', 28), ('comedy', 35), ('sci-fi', 878), ('Sci Fi', 878),
+                                            ('scary', 27), ('war', 10752)])
+def test_names_and_aliases(name, genre_id):
+    assert GenreTable(MOVIE_GENRES).lookup(name) == genre_id
+
+
+def test_parts_of_combined_tv_genres():
+    table = GenreTable(TV_GENRES)
+    assert table.lookup('war') == 10768
+    assert table.lookup('fantasy') == 10765
+    assert table.lookup('scifi') == 10765
+
+
+@pytest.mark.parametrize('name, genre_id', [('darma', 18), ('csi-fi', 878), ('sic-fi', 878), ('acton', 28),
+                                            ('horor', 27), ('comdey', 35), ('sceince fiction', 878)])
+def test_typos(name, genre_id):
+    assert GenreTable(MOVIE_GENRES).lookup(name) == genre_id
+
+
+@pytest.mark.parametrize('name', ['', 'xyz', 'cars', 'documentary'])
+def test_unknown_genres(name):
+    assert GenreTable(MOVIE_GENRES).lookup(name) is None
+
+
+def test_edit_distance():
+    assert edit_distance('drama', 'drama', 2) == 0
+    assert edit_distance('darma', 'drama', 2) == 1
+    assert edit_distance('comdy', 'comedy', 2) == 1
+    assert edit_distance('action', 'horror', 2) == 3
+    assert edit_distance('war', 'warandpolitics', 2) == 3
+
+
+def test_prefix_index_completes_from_any_word():
+    index = PrefixIndex(['The Dark Knight', 'Dark City', 'Knight and Day'])
+    assert index.complete('dark') == ['Dark City', 'The Dark Knight']
+    assert index.complete('kni') == ['Knight and Day', 'The Dark Knight']
+    assert index.complete('', 5) == []
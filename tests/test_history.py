@@ -0,0 +1,87 @@
+import asyncio
+
+from history import FILTER_CAPACITY, SeenHistory
+
+
+def test_marked_ids_are_seen_per_kind():
+    history = SeenHistory()
+    history.mark(1, 'movie', 550)
+    assert history.seen(1, 'movie', 550)
+    assert not history.seen(1, 'tv', 550)
+    assert not history.seen(2, 'movie', 550)
+
+
+def test_nothing_is_tracked_without_a_path():
+    history = SeenHistory()
+    for item_id in range(10):
+        history.mark(item_id, 'movie', item_id)
+    assert not history._dirty
+
+
+def test_filter_starts_over_at_capacity():
+    history = SeenHistory()
+    for item_id in range(FILTER_CAPACITY):
+        history.mark(1, 'movie', item_id)
+    history.mark(1, 'movie', 10_000)
+    assert history._filters[1][0] == 1
+    assert history.seen(1, 'movie', 10_000)
+
+
+def test_choose_prefers_unseen_titles():
+    history = SeenHistory()
+    results = [type('Result', (), {'id': item_id})() for item_id in range(3)]
+    for result in results[:2]:
+        history.mark(1, 'movie', result.id)
+    assert history.choose(1, 'movie', results) is results[2]
+
+
+def test_flushed_filters_are_read_back(tmp_path):
+    path = str(tmp_path / 'history.db')
+    history = SeenHistory(path)
+    history.mark(1, 'movie', 550)
+    history.flush()
+    assert SeenHistory(path).seen(1, 'movie', 550)
+
+
+def test_evicted_filters_are_flushed(tmp_path):
+    path = str(tmp_path / 'history.db')
+    history = SeenHistory(path, max_users=1)
+    history.mark(1, 'movie', 550)
+    history.mark(2, 'movie', 551)
+    assert 1 in history._pending
+    history.flush()
+    assert SeenHistory(path).seen(1, 'movie', 550)
+
+
+def test_saved_filter_survives_eviction_while_it_loads(tmp_path):
+    path = str(tmp_path / 'history.db')
+    saved = SeenHistory(path)
+    saved.mark(1, 'movie', 10)
+    saved.mark(1, 'movie', 11)
+    saved.flush()
+
+    async def run():
+        history = SeenHistory(path, max_users=1)
+        history.mark(1, 'movie', 12)
+        # Evicts user 1 before their saved filter has been read
+        history.mark(2, 'movie', 13)
+        history.flush()
+        await asyncio.gather(*history._loading.values())
+        history.flush()
+
+    asyncio.run(run())
+    reloaded = SeenHistory(path)
+    assert all(reloaded.seen(1, 'movie', item_id) for item_id in (10, 11, 12))
+    assert reloaded._filters[1][0] == 3
+
+
+def test_writers_sharing_a_file_merge_their_marks(tmp_path):
+    path = str(tmp_path / 'history.db')
+    first, second = SeenHistory(path), SeenHistory(path)
+    first.mark(1, 'movie', 10)
+    second.mark(1, 'movie', 20)
+    first.flush()
+    second.flush()
+    reloaded = SeenHistory(path)
+    assert reloaded.seen(1, 'movie', 10)
+    assert reloaded.seen(1, 'movie', 20)
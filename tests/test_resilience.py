@@ -0,0 +1,85 @@
+import asyncio
+from email.utils import formatdate
+
+from rate_limit import FairRateLimiter, current_guild
+from resilience import CLOSED, HALF_OPEN, OPEN, BreakerBoard, CircuitBreaker, RetryPolicy, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2') == 2.0
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(formatdate(0, usegmt=True)) == 0.0
+
+
+def test_retry_policy():
+    policy = RetryPolicy(base=0.5, cap=2)
+    assert policy.retryable(None) and policy.retryable(429) and policy.retryable(503)
+    assert not policy.retryable(404)
+    assert policy.delay(0, retry_after=3) == 3
+    assert all(0 <= policy.delay(10) <= 2 for _ in range(100))
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_success()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_probes_after_the_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # A failed probe opens it again at once
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_breaker_board_keeps_one_breaker_per_endpoint():
+    board = BreakerBoard(failure_threshold=1)
+    assert board.get('/discover/movie') is board.get('/discover/movie')
+    board.get('/discover/movie').record_failure()
+    assert board.open_endpoints() == ['/discover/movie']
+
+
+def test_limiter_serves_the_burst_at_once():
+    async def run():
+        limiter = FairRateLimiter(rate=1, burst=3)
+        for _ in range(3):
+            await asyncio.wait_for(limiter.acquire(), 0.1)
+        return limiter
+
+    assert asyncio.run(run()).tokens < 1
+
+
+def test_limiter_serves_guilds_round_robin():
+    async def run():
+        limiter = FairRateLimiter(rate=1000, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def request(guild, n):
+            current_guild.set(guild)
+            await limiter.acquire()
+            order.append((guild, n))
+
+        # A noisy guild queues first but only gets every other token
+        tasks = [asyncio.create_task(request('noisy', n)) for n in range(3)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(request('quiet', n)) for n in range(2)]
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(run())
+    assert [guild for guild, _ in order] == ['noisy', 'quiet', 'noisy', 'quiet', 'noisy']
@@ -0,0 +1,69 @@
+import asyncio
+
+from router import Argument, CommandRouter
+
+
+def make_router():
+    router = CommandRouter()
+    calls = []
+
+    @router.command('recommend', args=[Argument('genre', rest=True)])
+    async def recommend(message, genre):
+        calls.append(('recommend', genre))
+
+    @router.command('recommend list', args=[Argument('genre', rest=True)], usage='!recommend list <genre>')
+    async def recommend_list(message, genre):
+        calls.append(('list', genre))
+
+    @router.command('top', args=[Argument('count', type=int, default=5)])
+    async def top(message, count):
+        calls.append(('top', count))
+
+    return router, calls
+
+
+def test_longest_path_wins():
+    router, _ = make_router()
+    command, kwargs = router.resolve('!recommend list science fiction')
+    assert command is router.get('recommend list')
+    assert kwargs == {'genre': 'science fiction'}
+    command, kwargs = router.resolve('!RECOMMEND action')
+    assert command is router.get('recommend')
+    assert kwargs == {'genre': 'action'}
+
+
+def test_unknown_or_unprefixed_content_is_not_routed():
+    router, _ = make_router()
+    assert router.resolve('recommend action') is None
+    assert router.resolve('!unknown') is None
+    assert router.get('recommend tv') is None
+
+
+def test_arguments_are_converted_and_defaulted():
+    router, _ = make_router()
+    assert router.resolve('!top 3')[1] == {'count': 3}
+    assert router.resolve('!top')[1] == {'count': 5}
+    assert router.resolve('!top many')[1] is None
+    assert router.resolve('!recommend list')[1] is None
+
+
+class Channel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+class Message:
+    def __init__(self):
+        self.channel = Channel()
+
+
+def test_dispatch_calls_the_handler_or_shows_usage():
+    router, calls = make_router()
+    message = Message()
+    asyncio.run(router.dispatch(message, router.resolve('!recommend list drama')))
+    asyncio.run(router.dispatch(message, router.resolve('!recommend list')))
+    assert calls == [('list', 'drama')]
+    assert message.channel.sent == ['Usage: !recommend list <genre>']
@@ -0,0 +1,58 @@
+from records import Title
+from search_index import SearchIndex, tokenize
+
+
+def title(title_id, name, overview=''):
+    return Title(title_id, name, overview, None, (), 0.0, 0.0, 'en')
+
+
+def make_index():
+    index = SearchIndex()
+    index.add('movie', title(1, 'The Dark Knight', 'Batman faces the Joker in Gotham'))
+    index.add('movie', title(2, 'Knight and Day', 'A spy comedy'))
+    index.add('movie', title(3, 'Dark City', 'A man wakes up in a strange city'))
+    index.add('tv', title(4, 'Dark', 'A German family drama about time travel'))
+    return index
+
+
+def ids(results):
+    return [record.id for record in results]
+
+
+def test_tokenize_drops_accents_and_punctuation():
+    assert tokenize('Amélie (2001)') == ['amelie', '2001']
+
+
+def test_title_matches_rank_first():
+    assert ids(make_index().search('dark knight '))[0] == 1
+
+
+def test_any_word_is_enough_by_default():
+    assert set(ids(make_index().search('dark knight '))) == {1, 2, 3, 4}
+
+
+def test_match_all_requires_every_word():
+    assert ids(make_index().search('dark knight ', match_all=True)) == [1]
+
+
+def test_match_all_ignores_stopwords():
+    assert ids(make_index().search('the dark knight ', match_all=True)) == [1]
+    assert ids(make_index().search('knight of day ', match_all=True)) == [2]
+
+
+def test_last_word_matches_as_a_prefix():
+    assert ids(make_index().search('goth')) == [1]
+    assert ids(make_index().search('goth ')) == []
+
+
+def test_kind_filter():
+    assert ids(make_index().search('dark ', kind='tv')) == [4]
+
+
+def test_readding_replaces_and_removing_forgets():
+    index = make_index()
+    index.add('movie', title(3, 'Light City'))
+    assert 3 not in ids(index.search('dark '))
+    index.remove('movie', 1)
+    assert ids(index.search('joker ')) == []
+    assert len(index) == 3
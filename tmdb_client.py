@@ -0,0 +1,328 @@
+import asyncio
+import sqlite3
+import time
+
+import aiohttp
+
+from cache import ResponseCache
+from catalog_store import CatalogStore
+from config import config
+from metrics import endpoint_label, metrics
+from records import loads
+from rate_limit import FairRateLimiter
+from resilience import BreakerBoard, RetryPolicy, parse_retry_after
+
+# Overridable so benchmarks can point the bot at a local fake TMDB
+BASE_URL = config.tmdb_base_url
+KINDS = ('movie', 'tv')
+# TMDB's own default, left out of requests so every caller shares one cache key
+DEFAULT_SORT = 'popularity.desc'
+
+
+def discover_query(kind, genre_id=None, page=1, sort=DEFAULT_SORT):
+    """
+    Path and params of a /discover request
+    Params
+        - genre_id -> optional TMDB genre id, or comma separated ids for titles in all of them
+    Returns
+        - (path, params)
+    """
+    if kind not in KINDS:
+        raise ValueError(f'Unknown media kind: {kind}')
+    return f'/discover/{kind}', {'with_genres': genre_id, 'page': page, 'sort_by': None if sort == DEFAULT_SORT else sort}
+
+
+class TMDBClient:
+    """
+    Async client for the TMDB API shared by every fetcher in the bot.
+    One pooled keep-alive session is opened lazily on the running event loop,
+    every attempt gets a timeout and failed requests are retried by the retry
+    policy within a per-request deadline, so a slow TMDB call never blocks the
+    loop. Each endpoint has a circuit breaker: while TMDB keeps failing requests
+    fail fast and get() answers from expired cached or stored responses instead.
+    Responses go through the shared response cache when one is given, and
+    catalog responses are written through to the on-disk store when one is given.
+    Results of list endpoints are decoded straight into Title records.
+    Concurrent requests for the same endpoint and params share one fetch, and
+    every attempt waits for a token from the rate limiter when one is given.
+    Cache misses read through the store before going to the network, so shard
+    processes sharing a store reuse each other's fetches. Only the process
+    that sets revalidate refreshes stale entries.
+    Params
+        - base_url -> TMDB API root
+        - timeout -> seconds allowed per attempt
+        - policy -> RetryPolicy deciding retries, backoff and the request deadline
+        - breakers -> BreakerBoard holding the per-endpoint circuit breakers
+        - pool_size -> max open connections in the pool
+        - cache -> optional ResponseCache
+        - store -> optional CatalogStore
+        - limiter -> optional FairRateLimiter
+    """
+
+    def __init__(self, base_url=BASE_URL, timeout=5, policy=None, breakers=None, pool_size=20, cache=None, store=None,
+                 limiter=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.policy = policy or RetryPolicy()
+        self.breakers = breakers or BreakerBoard()
+        self.pool_size = pool_size
+        self.cache = cache
+        self.store = store
+        self.limiter = limiter
+        self.revalidate = True
+        self.snapshot_at = 0
+        self._session = None
+        self._inflight = {}
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def preconnect(self, connections=4):
+        """
+        Open pooled connections to TMDB ahead of the first command, so it doesn't
+        wait for a DNS lookup and TLS handshake. Each one is opened by a HEAD
+        request without the API key, whose answer doesn't matter.
+        Returns
+            - number of connections opened
+        """
+        session = self._get_session()
+
+        async def open_one():
+            try:
+                async with session.head(self.base_url + '/configuration'):
+                    return True
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
+        opened = await asyncio.gather(*(open_one() for _ in range(min(connections, self.pool_size))))
+        return sum(opened)
+
+    async def get(self, path, params=None):
+        """
+        GET a TMDB endpoint and decode the JSON body.
+        Fresh cached responses are returned without a request, stale ones are
+        returned at once while a background task revalidates them. When the
+        fetch fails, eg:- TMDB is down and the breaker is open, an expired
+        response is served rather than nothing.
+        Params
+            - path -> endpoint path, eg:- /discover/movie
+            - params -> extra query params, None values are dropped
+        Returns
+            - The decoded JSON body, or None if every attempt failed and nothing was ever cached
+        """
+        key = ResponseCache.make_key(path, params)
+        if self.cache is not None:
+            cached = self.cache.lookup(key)
+            if cached is not None:
+                data, fresh = cached
+                if not fresh and self.revalidate:
+                    self._fetch_shared(key, path, params)
+                return data
+            data = await self._read_through(key)
+            if data is not None:
+                return data
+        # Shielded so a cancelled caller doesn't cancel the fetch other callers share
+        data = await asyncio.shield(self._fetch_shared(key, path, params))
+        if data is None:
+            data = await self._degraded(key, path)
+        return data
+
+    async def _degraded(self, key, path):
+        """
+        Last resort answer for a failed fetch: the cached or stored response however old it is
+        """
+        data = self.cache.lookup_expired(key) if self.cache is not None else None
+        if data is None:
+            row = await self._stored(key)
+            if row is not None:
+                data = loads(row[0], row[1])
+        if data is not None:
+            metrics.inc('moviebot_tmdb_degraded_total', endpoint=endpoint_label(path))
+        return data
+
+    async def _read_through(self, key):
+        """
+        Serve a cache miss from the shared store if another process fetched it recently enough
+        """
+        row = await self._stored(key)
+        if row is None:
+            return None
+        path, body, fetched_at = row
+        ttl, stale = self.cache.ttl_for(path)
+        if time.time() - fetched_at > ttl + stale:
+            return None
+        data = loads(path, body)
+        self.cache.store(key, path, data, len(body), fetched_at)
+        return data
+
+    async def _stored(self, key):
+        """
+        Read a response from the shared store, a store that can't be read counts as a miss
+        Returns
+            - (path, body, fetched_at), or None
+        """
+        if self.store is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.store.get, key)
+        except sqlite3.Error as e:
+            print('Error while reading the catalog store:', repr(e))
+            return None
+
+    async def refresh(self, path, params=None):
+        """
+        Fetch an endpoint from the network even when it is cached, joining a fetch
+        already in flight. The cached copy is kept if the fetch fails.
+        Returns
+            - The decoded JSON body, or None if every attempt failed
+        """
+        key = ResponseCache.make_key(path, params)
+        return await asyncio.shield(self._fetch_shared(key, path, params))
+
+    def cached(self, path, params=None):
+        """
+        The cached response of a request however old it is, without fetching,
+        for answers that can't wait for TMDB
+        Returns
+            - The decoded JSON body, or None when nothing is cached
+        """
+        if self.cache is None:
+            return None
+        return self.cache.lookup_expired(ResponseCache.make_key(path, params))
+
+    async def discover(self, kind, genre_id=None, page=1, sort=DEFAULT_SORT, fresh=False):
+        """
+        One page of /discover results, the single query movies and TV shows both go through
+        Params
+            - kind -> movie or tv
+            - genre_id -> optional TMDB genre id to filter by
+            - page -> 1 based page number
+            - sort -> TMDB sort_by, eg:- vote_average.desc
+            - fresh -> refetch even when cached
+        Returns
+            - list of Title, or None if TMDB couldn't be reached
+        """
+        path, params = discover_query(kind, genre_id, page, sort)
+        fetch = self.refresh if fresh else self.get
+        data = await fetch(path, params)
+        return None if data is None else data.get('results', [])
+
+    async def popular(self, kind, fresh=False):
+        """
+        TMDB's current popular list for a kind
+        Returns
+            - list of Title, or None if TMDB couldn't be reached
+        """
+        if kind not in KINDS:
+            raise ValueError(f'Unknown media kind: {kind}')
+        fetch = self.refresh if fresh else self.get
+        data = await fetch(f'/{kind}/popular')
+        return None if data is None else data.get('results', [])
+
+    def _fetch_shared(self, key, path, params):
+        """
+        Start a fetch for a key, or join the one already in flight
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_store(key, path, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch_and_store(self, key, path, params):
+        fetched = await self._fetch(path, params)
+        if fetched is None:
+            return None
+        data, body = fetched
+        if self.cache is not None:
+            self.cache.store(key, path, data, len(body))
+        if self.store is not None and self.store.persists(path):
+            # Shard processes share the store, a locked database mustn't cost the callers the data
+            try:
+                await asyncio.to_thread(self.store.save, key, path, body)
+            except sqlite3.Error as e:
+                print(f'Error while saving {path} to the catalog store:', repr(e))
+        return data
+
+    async def load_snapshot(self):
+        """
+        Load the on-disk catalog snapshot into the response cache. Later calls
+        only load responses saved since the previous one.
+        Returns
+            - Number of responses restored
+        """
+        if self.store is None or self.cache is None:
+            return 0
+        rows = await asyncio.to_thread(self.store.load, self.snapshot_at)
+        for key, path, body, fetched_at in rows:
+            self.cache.restore(key, path, loads(path, body), len(body), fetched_at)
+            self.snapshot_at = max(self.snapshot_at, fetched_at)
+        return len(rows)
+
+    async def _fetch(self, path, params):
+        """
+        Fetch a TMDB endpoint over the network, retrying as the policy allows
+        Returns
+            - (data, body) -> decoded body and the raw bytes, or None
+        """
+        query = {'api_key': config.tmdb_api_key}
+        if params:
+            query.update({k: v for k, v in params.items() if v is not None})
+        query = {k: str(v) for k, v in query.items() if v is not None}
+
+        session = self._get_session()
+        endpoint = endpoint_label(path)
+        breaker = self.breakers.get(endpoint)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.policy.deadline
+        for attempt in range(self.policy.attempts):
+            if not breaker.allow():
+                metrics.inc('moviebot_tmdb_short_circuited_total', endpoint=endpoint)
+                return None
+            try:
+                if self.limiter is not None:
+                    await asyncio.wait_for(self.limiter.acquire(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                return None
+            start = time.perf_counter()
+            status, retry_after = None, None
+            try:
+                timeout = aiohttp.ClientTimeout(total=max(0.1, min(self.timeout, deadline - loop.time())))
+                async with session.get(self.base_url + path, params=query, timeout=timeout) as response:
+                    status = response.status
+                    if status == 200:
+                        body = await response.read()
+                        breaker.record_success()
+                        return loads(path, body), body
+                    print(f'Error while fetching {path}: {status}')
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f'Error occurred while fetching {path}:', repr(e))
+            finally:
+                metrics.inc('moviebot_tmdb_requests_total', endpoint=endpoint, status=str(status or 'error'))
+                metrics.observe('moviebot_tmdb_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+
+            if not self.policy.retryable(status):
+                # TMDB answered, the request itself is bad, eg:- 404
+                breaker.record_success()
+                return None
+            if status != 429:
+                breaker.record_failure()
+            delay = self.policy.delay(attempt, retry_after)
+            if attempt == self.policy.attempts - 1 or loop.time() + delay >= deadline:
+                break
+            metrics.inc('moviebot_tmdb_retries_total', endpoint=endpoint)
+            await asyncio.sleep(delay)
+        return None
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# TMDB allows roughly 50 requests per second and 20 connections per IP
+tmdb = TMDBClient(cache=ResponseCache(), store=CatalogStore.from_env(), limiter=FairRateLimiter(rate=40, burst=40))